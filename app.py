@@ -1,14 +1,19 @@
 # web_app.py - Flask Web Interface for Slap Red Scraper v0.5.4
-from flask import Flask, request, jsonify, render_template_string, flash, redirect, url_for, send_file
+from flask import Flask, request, jsonify, render_template_string, flash, redirect, url_for, send_file, Response, stream_with_context
 from flask_login import LoginManager, UserMixin, login_required, login_user, logout_user, current_user
 import configparser
-import threading
-import asyncio
 import os
 import sys
 import json
 from datetime import datetime
-import glob
+
+# The scraper modules import each other by bare name.
+for _pkg in ("core", "log", "io", "proc", "acq", "ui"):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', _pkg))
+from web_runner import ScrapeRunner
+from status_stream import StatusBroadcaster
+from file_index import OutputFileIndex
+from checkpoint import RunCheckpoint
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24).hex()
@@ -25,6 +30,16 @@ scraper_status = {
     "start_time": None,
     "last_update": None
 }
+status_stream = StatusBroadcaster()
+status_stream.publish(scraper_status)
+
+def publish_status(job, site=None):
+    """Runner callback: keeps scraper_status current for /status and pushes the change to /status/stream clients."""
+    scraper_status.update(job)
+    status_stream.publish(scraper_status, site)
+
+# Jobs run the real pipeline on one background event loop; each site's progress lands in scraper_status.
+runner = ScrapeRunner('In/config.ini', on_update=publish_status)
 
 class User(UserMixin):
     def __init__(self, id):
@@ -128,13 +143,14 @@ INDEX_HTML = """
     </div>
 
     <div class="status-bar status-{{ status.css_class }}">
-        <h3>Status: {{ status.message }}</h3>
-        {% if status.progress > 0 %}
+        <h3>Status: <span id="status-message">{{ status.message }}</span></h3>
+        {% if status.is_running or status.progress > 0 %}
             <div class="progress-bar">
-                <div class="progress-fill" style="width: {{ (status.progress / status.total * 100) if status.total > 0 else 0 }}%"></div>
+                <div class="progress-fill" id="progress-fill" style="width: {{ (status.progress / status.total * 100) if status.total > 0 else 0 }}%"></div>
             </div>
-            <p>Progress: {{ status.progress }} / {{ status.total }} URLs processed 
-               ({{ "%.1f"|format((status.progress / status.total * 100) if status.total > 0 else 0) }}%)</p>
+            <p>Progress: <span id="progress-text">{{ status.progress }} / {{ status.total }} URLs processed 
+               ({{ "%.1f"|format((status.progress / status.total * 100) if status.total > 0 else 0) }}%)</span></p>
+            <p id="last-site"></p>
         {% endif %}
         {% if status.start_time %}
             <p><strong>Started:</strong> {{ status.start_time }}</p>
@@ -149,7 +165,7 @@ INDEX_HTML = """
         <h2>📊 Quick Stats</h2>
         <div class="stats">
             <div class="stat">
-                <div class="stat-number">{{ output_files|length }}</div>
+                <div class="stat-number">{{ output_files.total }}</div>
                 <div class="stat-label">Output Files</div>
             </div>
             <div class="stat">
@@ -178,10 +194,27 @@ INDEX_HTML = """
         </form>
     </div>
 
+    <div class="card">
+        <h2>⏯️ Resume an Interrupted Run</h2>
+        {% if runs %}
+        <form method="post" action="/resume_scraper">
+            <div class="form-group">
+                <label for="run_id">Run ID (sites its checkpoint marks done are skipped):</label>
+                <select id="run_id" name="run_id">
+                    {% for run in runs %}<option value="{{ run }}">{{ run }}</option>{% endfor %}
+                </select>
+            </div>
+            <button type="submit" {{ 'disabled' if status.is_running else '' }}>⏯️ Resume</button>
+        </form>
+        {% else %}
+        <p>No checkpointed runs yet.</p>
+        {% endif %}
+    </div>
+
     <div class="card">
         <h2>📁 Output Files</h2>
         <div class="file-list">
-            {% for file in output_files %}
+            {% for file in output_files.files %}
                 <div class="file-item">
                     <span><strong>{{ file.name }}</strong> ({{ file.size }})</span>
                     <a href="/download/{{ file.name }}" class="download-btn button">⬇️ Download</a>
@@ -192,6 +225,9 @@ INDEX_HTML = """
                 </p>
             {% endfor %}
         </div>
+        {% if output_files.total > output_files.files|length %}
+            <p style="color: #666;">Showing the {{ output_files.files|length }} newest of {{ output_files.total }} files. The full list is available from <a href="/api/files">/api/files</a>.</p>
+        {% endif %}
     </div>
 
     <div class="card">
@@ -217,7 +253,35 @@ INDEX_HTML = """
     </div>
 
     <script>
-        // Auto-refresh status every 3 seconds when running
+        let wasRunning = {{ 'true' if status.is_running else 'false' }};
+
+        function showStatus(data) {
+            if (!data.message) return;
+            document.getElementById('status-message').textContent = data.message;
+            const percent = data.total > 0 ? (data.progress / data.total) * 100 : 0;
+            const fill = document.getElementById('progress-fill');
+            if (fill) fill.style.width = percent + '%';
+            const text = document.getElementById('progress-text');
+            if (text) text.textContent = data.progress + ' / ' + data.total + ' URLs processed (' + percent.toFixed(1) + '%)';
+            // Reload once the run ends so the stats and output files are current.
+            if (wasRunning && !data.is_running) location.reload();
+            wasRunning = data.is_running;
+        }
+
+        // Live updates pushed by the server as each site finishes
+        function watchStatus() {
+            const source = new EventSource('/status/stream');
+            source.addEventListener('status', e => showStatus(JSON.parse(e.data)));
+            source.addEventListener('sites', e => {
+                const sites = JSON.parse(e.data).sites;
+                const site = sites[sites.length - 1];
+                if (!site) return;
+                const outcome = site.unchanged ? 'unchanged' : (site.success ? site.bonus_count + ' bonuses' : 'failed');
+                document.getElementById('last-site').textContent = 'Last site: ' + site.url + ' (' + outcome + ', ' + site.rate + ' req/s)';
+            });
+        }
+
+        // Fallback for browsers without EventSource: poll every 3 seconds when running
         function updateStatus() {
             fetch('/status')
                 .then(response => response.json())
@@ -235,8 +299,12 @@ INDEX_HTML = """
         }
 
         // Start status updates if scraper is running
-        if ({{ 'true' if status.is_running else 'false' }}) {
-            updateStatus();
+        if (wasRunning) {
+            if (window.EventSource) {
+                watchStatus();
+            } else {
+                updateStatus();
+            }
         }
 
         // Handle form submission
@@ -301,49 +369,8 @@ def logout():
     flash('You have been logged out successfully.', 'info')
     return redirect(url_for('login'))
 
-def get_output_files():
-    """Get list of output files with metadata."""
-    files = []
-    patterns = ['*.csv', '*.xlsx', '*.json', '*.log']
-    
-    # Check current directory
-    for pattern in patterns:
-        for filepath in glob.glob(pattern):
-            if os.path.isfile(filepath):
-                size = os.path.getsize(filepath)
-                size_str = format_file_size(size)
-                files.append({
-                    'name': os.path.basename(filepath),
-                    'size': size_str,
-                    'path': filepath
-                })
-    
-    # Check common output directories
-    for directory in ['data', 'out', 'logs', 'cache']:
-        if os.path.exists(directory):
-            for pattern in patterns:
-                for filepath in glob.glob(f'{directory}/{pattern}'):
-                    if os.path.isfile(filepath):
-                        size = os.path.getsize(filepath)
-                        size_str = format_file_size(size)
-                        files.append({
-                            'name': os.path.basename(filepath),
-                            'size': size_str,
-                            'path': filepath
-                        })
-    
-    return sorted(files, key=lambda x: x['name'])
-
-def format_file_size(size):
-    """Format file size in human readable format."""
-    if size < 1024:
-        return f"{size} bytes"
-    elif size < 1024 * 1024:
-        return f"{size/1024:.1f} KB"
-    elif size < 1024 * 1024 * 1024:
-        return f"{size/(1024*1024):.1f} MB"
-    else:
-        return f"{size/(1024*1024*1024):.1f} GB"
+# Directory mtimes tell the index when to re-read, so page loads stay flat as output accumulates.
+output_index = OutputFileIndex(['.', 'data', 'out', 'logs', 'cache'], ['*.csv', '*.xlsx', '*.json', '*.log'])
 
 @app.route('/')
 @login_required
@@ -359,9 +386,16 @@ def index():
         css_class = 'completed'
     
     scraper_status['css_class'] = css_class
-    output_files = get_output_files()
+    # The newest files only; /api/files pages through the rest.
+    output_files = output_index.query(sort='modified', descending=True, per_page=50)
     
-    return render_template_string(INDEX_HTML, status=scraper_status, output_files=output_files)
+    return render_template_string(INDEX_HTML, status=scraper_status, output_files=output_files, runs=checkpoint_runs())
+
+def checkpoint_runs():
+    """Run IDs that have a checkpoint, newest first."""
+    config = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+    config.read(runner.config_path)
+    return RunCheckpoint.list_runs(config.get('checkpoint', 'dir', fallback='cache/checkpoints'))
 
 @app.route('/run_scraper', methods=['POST'])
 @login_required
@@ -385,64 +419,7 @@ def run_scraper_route():
             flash('No valid URLs found in file. Please check the file format.', 'error')
             return redirect(url_for('index'))
         
-        # Create necessary directories
-        os.makedirs('temp', exist_ok=True)
-        os.makedirs('data', exist_ok=True)
-        
-        # Save URLs to file
-        urls_file_path = 'temp/uploaded_urls.txt'
-        with open(urls_file_path, 'w') as f:
-            f.write('\n'.join(urls))
-        
-        # Update status
-        scraper_status.update({
-            "message": "Starting...",
-            "progress": 0,
-            "total": len(urls),
-            "is_running": True,
-            "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        
-        def run():
-            try:
-                scraper_status.update({
-                    "message": "Running",
-                    "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-                # Simulate scraper process (replace with actual scraper call)
-                import time
-                for i in range(len(urls)):
-                    time.sleep(2)  # Simulate processing time
-                    scraper_status.update({
-                        "progress": i + 1,
-                        "message": f"Processing URL {i + 1} of {len(urls)}",
-                        "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                
-                # Create sample output file
-                output_file = f"data/bonuses_{datetime.now().strftime('%Y-%m-%d')}.csv"
-                with open(output_file, 'w') as f:
-                    f.write("url,bonus_count,status,timestamp\n")
-                    for i, url in enumerate(urls):
-                        f.write(f"{url},{i % 5 + 1},success,{datetime.now().isoformat()}\n")
-                
-                scraper_status.update({
-                    "message": "Completed",
-                    "is_running": False,
-                    "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-            except Exception as e:
-                scraper_status.update({
-                    "message": f"Error: {str(e)}",
-                    "is_running": False,
-                    "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-        
-        # Start scraper in background thread
-        threading.Thread(target=run, daemon=True).start()
+        runner.submit(urls=urls)
         flash(f'Scraper started successfully with {len(urls)} URLs!', 'success')
         
     except Exception as e:
@@ -455,12 +432,37 @@ def run_scraper_route():
     
     return redirect(url_for('index'))
 
+@app.route('/resume_scraper', methods=['POST'])
+@login_required
+def resume_scraper():
+    """Continues an interrupted run, scraping only the sites its checkpoint does not mark done."""
+    if scraper_status['is_running']:
+        flash('Scraper is already running. Please wait for it to complete.', 'error')
+        return redirect(url_for('index'))
+
+    run_id = request.form.get('run_id', '').strip()
+    # Only IDs of existing checkpoints, since the ID becomes part of a file path.
+    if run_id not in checkpoint_runs():
+        flash('Unknown run ID. Pick one of the checkpointed runs.', 'error')
+        return redirect(url_for('index'))
+
+    runner.submit(resume=run_id)
+    flash(f'Resuming run {run_id}.', 'success')
+    return redirect(url_for('index'))
+
 @app.route('/status')
 @login_required
 def status():
     """Returns the current scraper status as JSON."""
     return jsonify(scraper_status)
 
+@app.route('/status/stream')
+@login_required
+def status_stream_route():
+    """Pushes status and per-site events as Server-Sent Events."""
+    return Response(stream_with_context(status_stream.stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/download/<filename>')
 @login_required
 def download_file(filename):
@@ -479,8 +481,30 @@ def download_file(filename):
 @app.route('/api/files')
 @login_required
 def api_files():
-    """API endpoint to get list of output files."""
-    return jsonify(get_output_files())
+    """
+    API endpoint to get list of output files. Without query parameters it returns every file as a
+    plain list, as it always has. Any of these parameters returns one page instead, as
+    {files, total, page, per_page, pages}: type (comma-separated extensions), since/until
+    (YYYY-MM-DD, by modification date), q (name substring), sort (name, modified, size, type),
+    order (asc, desc), page, per_page (max 500).
+    """
+    args = request.args
+    if not args:
+        return jsonify(output_index.files())
+    try:
+        result = output_index.query(
+            types=[t for t in args.get('type', '').split(',') if t.strip()],
+            since=datetime.strptime(args['since'], '%Y-%m-%d').date() if args.get('since') else None,
+            until=datetime.strptime(args['until'], '%Y-%m-%d').date() if args.get('until') else None,
+            search=args.get('q'),
+            sort=args.get('sort', 'name'),
+            descending=args.get('order', 'asc').lower() == 'desc',
+            page=args.get('page', 1, type=int),
+            per_page=min(args.get('per_page', 50, type=int), 500),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
 
 if __name__ == '__main__':
     # Create necessary directories
@@ -1,81 +1,535 @@
 # main.py
+import argparse
 import asyncio
+import contextlib
+import datetime
+import functools
 import aiohttp
 import logging
-import configparser
-import random
+import math
+import multiprocessing
+import os
+import queue
+import socket
 import time
-import collections
-from typing import List, Deque
-from urllib.parse import urlparse, urlunparse
+import configparser
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+from urllib.parse import urlparse
+from sqlalchemy.exc import SQLAlchemyError
 
 # Re-added api_client to the import list
-import io_handler, ui, processing, auth, models, config, logger_config, api_client
+import io_handler, ui, processing, auth, models, config, logger_config, api_client, scheduler, rate_limiter, run_cache, http_session, result_sink, claim_config, comparison_report, archive
+from metrics_store import MetricsStore
+from resilience import CircuitBreakers, HostGuard, RetryPolicy
+from latency import LatencyTracker
+from job_queue import JobQueue
+from queue_coordinator import JobQueueServer, RemoteJobQueue, open_job_queue
+from checkpoint import RunCheckpoint
+from auth_cache import AuthCache, MerchantPageCache
+from fingerprint import FingerprintStore, payload_fingerprint
+from models import SITE_FAILED, SITE_SCRAPED, SITE_UNCHANGED, SiteOutcome
 
-async def process_url(url: str, app_config: configparser.ConfigParser, logger: logging.Logger, session: aiohttp.ClientSession, request_tracker: Deque[float]):
-    cleaned_url = ""
-    try:
-        cleaned_url = urlunparse(urlparse(url)._replace(path="", params="", query="", fragment=""))
-    except Exception:
-        cleaned_url = url
+async def _login(cleaned_url: str, host: str, app_config: configparser.ConfigParser, logger: logging.Logger, session: aiohttp.ClientSession, limiter: rate_limiter.RateLimiter, pacer: scheduler.HostPacer, auth_cache: Optional[AuthCache], page_cache: Optional[MerchantPageCache], guard: Optional[HostGuard] = None):
+    await pacer.wait(host)
+    auth_data = await auth.get_auth(cleaned_url, app_config, logger, session, limiter, page_cache, guard)
+    if auth_data and auth_cache:
+        auth_cache.put(cleaned_url, auth_data)
+    return auth_data
 
-    auth_data = await auth.get_auth(cleaned_url, app_config, logger, session, request_tracker)
+async def process_url(url: str, app_config: configparser.ConfigParser, logger: logging.Logger, session: aiohttp.ClientSession, limiter: rate_limiter.RateLimiter, pacer: scheduler.HostPacer, auth_cache: Optional[AuthCache] = None, page_cache: Optional[MerchantPageCache] = None, fingerprints: Optional[FingerprintStore] = None, guard: Optional[HostGuard] = None):
+    cleaned_url = io_handler.clean_url(url)
+    host = urlparse(cleaned_url).netloc or cleaned_url
+    if guard and not guard.allow(cleaned_url):
+        # The host failed repeatedly in recent runs; skip it without spending a slot on timeouts.
+        logger.info("circuit_open_skip", extra={"url": cleaned_url})
+        return [], cleaned_url, False, 0, False, None
+
+    auth_data = auth_cache.get(cleaned_url) if auth_cache else None
+    from_cache = auth_data is not None
     if not auth_data:
-        return [], cleaned_url, False, 0
+        auth_data = await _login(cleaned_url, host, app_config, logger, session, limiter, pacer, auth_cache, page_cache, guard)
+        if not auth_data:
+            return [], cleaned_url, False, 0, False, None
 
-    min_delay = app_config.getfloat('scraper', 'min_request_delay', fallback=1.0)
-    max_delay = app_config.getfloat('scraper', 'max_request_delay', fallback=3.0)
-    await asyncio.sleep(random.uniform(min_delay, max_delay))
+    # Politeness delay is applied per host, so other sites keep running meanwhile.
+    await pacer.wait(host)
 
     # Corrected: Call get_bonuses from api_client, not processing
-    bonuses_json = await api_client.get_bonuses(auth_data, session, logger)
+    try:
+        bonuses_json = await api_client.get_bonuses(auth_data, session, logger, limiter, guard)
+    except api_client.AuthRejectedError:
+        if auth_cache:
+            auth_cache.invalidate(cleaned_url)
+        if not from_cache:
+            return [], cleaned_url, False, 0, False, None
+        # The cached token went stale: log in once more and retry a single time.
+        logger.info("auth_cache_stale", extra={"url": cleaned_url})
+        auth_data = await _login(cleaned_url, host, app_config, logger, session, limiter, pacer, auth_cache, page_cache, guard)
+        if not auth_data:
+            return [], cleaned_url, False, 0, False, None
+        await pacer.wait(host)
+        try:
+            bonuses_json = await api_client.get_bonuses(auth_data, session, logger, limiter, guard)
+        except api_client.AuthRejectedError:
+            return [], cleaned_url, False, 0, False, None
     if bonuses_json is None:
-        return [], cleaned_url, True, 0
+        return [], cleaned_url, False, 0, False, None
+
+    # The fingerprint is returned rather than remembered: the caller stores it once the rows are written.
+    fingerprint = None
+    if fingerprints:
+        fingerprint = payload_fingerprint(bonuses_json)
+        if fingerprints.is_unchanged(cleaned_url, fingerprint):
+            # Same payload as the last run: the writer copies its stored rows forward, so skip processing.
+            logger.info("site_unchanged", extra={"url": cleaned_url, "fingerprint": fingerprint})
+            return [], cleaned_url, True, fingerprints.last_count(cleaned_url), True, None
 
     processed_bonuses = processing.process_bonuses(bonuses_json, cleaned_url, auth_data.merchant_name, logger)
     bonus_count = len(processed_bonuses)
     logger.info(f"Successfully processed {cleaned_url} - Found {bonus_count} bonuses.")
-    return processed_bonuses, cleaned_url, True, bonus_count
+    return processed_bonuses, cleaned_url, True, bonus_count, False, fingerprint
 
-async def main():
-    app_config = config.get_config()
+async def scrape_sites(urls: Iterable[str], app_config: configparser.ConfigParser, logger: logging.Logger, cache: run_cache.RunCache,
+                       limiter: rate_limiter.RateLimiter, on_result: Callable[[str, Any, float], Awaitable[Any]],
+                       session: Optional[aiohttp.ClientSession] = None) -> None:
+    """
+    Scrapes `urls` with the bounded worker pool on this process's event loop and awaits
+    on_result(url, result, secs) for each site in completion order. `result` is process_url's
+    tuple, or None when the task raised; its fingerprint is for on_result to remember once the
+    site's rows are written. A caller-owned `session` is used as is and left open.
+    """
+    auth_cache = AuthCache.from_config(app_config, cache) if cache.enabled else None
+    page_cache = MerchantPageCache(cache) if cache.enabled else None
+    skip_unchanged = cache.enabled and app_config.getboolean('cache', 'skip_unchanged_sites', fallback=True)
+    fingerprints = FingerprintStore(cache) if skip_unchanged else None
+    latency = LatencyTracker.from_config(app_config, cache) if cache.enabled else None
+    guard = HostGuard(RetryPolicy.from_config(app_config), CircuitBreakers.from_config(app_config, cache) if cache.enabled else None, logger, latency)
+    # A lazily leased stream from the job queue is consumed as it comes.
+    if latency and isinstance(urls, list) and app_config.getboolean('latency', 'order_slowest_first', fallback=True):
+        urls = latency.order(urls)
+    started_at = {}
+    # One URL per host contacted, for the latency summary at the end.
+    visited: Dict[str, str] = {}
+
+    concurrency = max(1, app_config.getint('scraper', 'max_concurrent_requests', fallback=1))
+    pacer = scheduler.HostPacer(
+        app_config.getfloat('scraper', 'min_request_delay', fallback=1.0),
+        app_config.getfloat('scraper', 'max_request_delay', fallback=3.0),
+    )
+
+    async with (contextlib.nullcontext(session) if session else http_session.create_session(app_config)) as session:
+        async def scrape(url: str):
+            started_at[url] = time.perf_counter()
+            if latency:
+                visited.setdefault(latency.host(url), url)
+            try:
+                return await process_url(url.strip(), app_config, logger, session, limiter, pacer, auth_cache, page_cache, fingerprints, guard)
+            except Exception as e:
+                logger.error(f"A task failed for URL {url.strip()}: {e}")
+                return None
+
+        async def finish(url: str, result):
+            await on_result(url, result, time.perf_counter() - started_at.pop(url, time.perf_counter()))
+
+        await scheduler.run_bounded(urls, scrape, concurrency, finish)
+
+    for host, url in visited.items():
+        phases = latency.stats(url)
+        if phases:
+            logger.info("host_latency", extra={"host": host, **phases})
+
+def _worker_config(values: Dict[str, Dict[str, str]], worker_id: int, workers: int) -> configparser.ConfigParser:
+    """
+    The worker's view of the parent's config, passed as {section: {key: raw value}}: its own log
+    file, and an equal share of the global request rate, the connection pool and the concurrency budget.
+    """
+    app_config = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+    app_config.read_dict(values)
+    log_root, log_ext = os.path.splitext(app_config.get('logging', 'log_file_path', fallback='logs/scraper.log'))
+    app_config.set('logging', 'log_file_path', f"{log_root}.w{worker_id}{log_ext}")
+    if not app_config.has_section('rate_limit'):
+        app_config.add_section('rate_limit')
+    app_config.set('rate_limit', 'global_rps', str(app_config.getfloat('rate_limit', 'global_rps', fallback=0.0) / workers))
+    if not app_config.has_section('http'):
+        app_config.add_section('http')
+    app_config.set('http', 'connection_limit', str(max(1, math.ceil(app_config.getint('http', 'connection_limit', fallback=100) / workers))))
+    concurrency = app_config.getint('scraper', 'max_concurrent_requests', fallback=1)
+    app_config.set('scraper', 'max_concurrent_requests', str(max(1, math.ceil(concurrency / workers))))
+    return app_config
+
+def worker_process(urls: List[str], config_values: Dict[str, Dict[str, str]], worker_id: int, workers: int,
+                   results: multiprocessing.Queue) -> None:
+    """
+    Entry point of one --workers process. Scrapes its shard on its own event loop and session,
+    processes the bonuses locally and sends them to the parent, which owns every output.
+    Run-cache updates are sent to the parent after each site instead of being written from here,
+    so a worker that dies keeps the logins, fingerprints and breaker state it already recorded.
+    """
+    app_config = _worker_config(config_values, worker_id, workers)
     logger = logger_config.setup_logger(app_config)
-    
-    urls = io_handler.load_urls(app_config.get('scraper', 'url_list_path'), logger)
+    cache = run_cache.RunCache.from_config(app_config).load(logger)
+    limiter = rate_limiter.RateLimiter.from_config(app_config)
+
+    async def run() -> None:
+        loop = asyncio.get_running_loop()
+
+        async def send(message) -> None:
+            # A bounded queue: when the parent's writers fall behind, this worker waits.
+            await loop.run_in_executor(None, results.put, message)
+
+        sent_requests = 0
+
+        async def forward(url: str, result, secs: float) -> None:
+            nonlocal sent_requests
+            requests, sent_requests = limiter.total_requests - sent_requests, limiter.total_requests
+            # A site is reported only after its records were sent, so the parent's checkpoint never runs ahead of its rows.
+            if result is not None and result[0]:
+                await send(("records", result[0]))
+                result = ([],) + tuple(result[1:])
+            await send(("site", url, result, secs, requests))
+            changes = cache.changes(clear=True)
+            if changes["set"] or changes["delete"]:
+                await send(("cache", changes))
+
+        await scrape_sites(urls, app_config, logger, cache, limiter, forward)
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        logger.error("worker_fail", extra={"worker": worker_id, "err": str(e)})
+    finally:
+        logger.info("claim_config_cache", extra=claim_config.default_classifier.stats())
+        results.put(("done", worker_id, cache.changes()))
+
+def _next_message(results: multiprocessing.Queue, timeout: float):
+    try:
+        return results.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+async def run_workers(urls: List[str], workers: int, app_config: configparser.ConfigParser, logger: logging.Logger,
+                      cache: run_cache.RunCache, on_result: Callable[[str, Any, float], Awaitable[Any]],
+                      on_records: Callable[[List[models.BonusRecord]], Awaitable[Any]], requests: rate_limiter.SlidingWindowCounter) -> None:
+    """
+    Shards `urls` by host across `workers` processes and feeds their results through `on_result`
+    and `on_records` on this loop, so the UI, metrics and outputs stay single-writer. Hosts are
+    balanced by their expected duration when latency history is available.
+    """
+    latency = LatencyTracker.from_config(app_config, cache) if cache.enabled else None
+    weight = (lambda url: latency.expected_secs(url) or 1.0) if latency else (lambda url: 1.0)
+    shards = [shard for shard in scheduler.shard_by_host(urls, workers, weight) if shard]
+    # Workers start from a fresh interpreter: forking a process with a running loop and threads is unsafe.
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue(maxsize=app_config.getint('output', 'sink_queue_size', fallback=64) * len(shards))
+    # The parent's config as plain values, so workers see exactly what the parent runs with, overrides included.
+    config_values = {section: dict(app_config.items(section, raw=True)) for section in app_config.sections()}
+    processes = [context.Process(target=worker_process, args=(shard, config_values, worker_id, len(shards), results), daemon=True)
+                 for worker_id, shard in enumerate(shards)]
+    for process in processes:
+        process.start()
+    logger.info("workers_started", extra={"workers": len(processes), "urls": [len(shard) for shard in shards]})
+
+    loop = asyncio.get_running_loop()
+    pending = set(range(len(processes)))
+
+    async def handle(message) -> None:
+        kind = message[0]
+        if kind == "records":
+            await on_records(message[1])
+        elif kind == "site":
+            _, url, result, secs, request_count = message
+            requests.add(request_count)
+            await on_result(url, result, secs)
+        elif kind == "cache":
+            cache.merge(message[1])
+        elif kind == "done":
+            cache.merge(message[2])
+            pending.discard(message[1])
+
+    try:
+        while pending:
+            message = await loop.run_in_executor(None, _next_message, results, 1.0)
+            if message is not None:
+                await handle(message)
+                continue
+            for worker_id in list(pending):
+                if not processes[worker_id].is_alive():
+                    logger.error("worker_exit", extra={"worker": worker_id, "exitcode": processes[worker_id].exitcode})
+                    pending.discard(worker_id)
+        # Anything a dead worker managed to send before exiting.
+        while (message := _next_message(results, 0.1)) is not None:
+            await handle(message)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+async def run_from_queue(jobs: Union[JobQueue, RemoteJobQueue], app_config: configparser.ConfigParser, logger: logging.Logger, cache: run_cache.RunCache,
+                         limiter: rate_limiter.RateLimiter, on_result: Callable[..., Awaitable[Any]],
+                         completions: Set[asyncio.Future]) -> None:
+    """
+    Scrapes URLs leased from the shared job queue until no job is pending or leased anywhere.
+    Batches are leased only as the worker pool asks for more URLs and held leases are renewed in the
+    background. Each site goes to `on_result` with a callback that completes its job once its rows
+    are written, so a node that dies with rows still buffered leaves the job to be leased again.
+    Completions still in flight are added to `completions` for the caller to await after the sink closes.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    batch_size = app_config.getint('queue', 'batch_size', fallback=max(1, app_config.getint('scraper', 'max_concurrent_requests', fallback=1)))
+    poll_seconds = app_config.getfloat('queue', 'poll_seconds', fallback=10.0)
+    held = set()
+    loop = asyncio.get_running_loop()
+
+    # Queue calls can wait out another node's write lock, so they run off the event loop.
+    def queue_call(method, *args):
+        return loop.run_in_executor(None, method, *args)
+
+    async def leased_urls():
+        while True:
+            batch = await queue_call(jobs.lease, owner, batch_size)
+            if not batch:
+                return
+            held.update(batch)
+            for url in batch:
+                yield url
+
+    async def renew() -> None:
+        while True:
+            await asyncio.sleep(jobs.lease_seconds / 3)
+            if held:
+                await queue_call(jobs.renew, owner, list(held))
+
+    def completed(url: str, future: asyncio.Future) -> None:
+        completions.discard(future)
+        held.discard(url)
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error("job_complete_fail", extra={"url": url, "owner": owner, "err": str(future.exception())})
+        elif not future.result():
+            logger.warning("job_lease_lost", extra={"url": url, "owner": owner})
+
+    async def finish(url: str, result, secs: float) -> None:
+        summary = {"success": False, "bonus_count": 0, "unchanged": False, "secs": round(secs, 3)}
+        if result is not None:
+            summary.update(success=result[2], bonus_count=result[3], unchanged=result[4])
+
+        def on_written() -> None:
+            future = queue_call(jobs.complete, owner, url, summary)
+            completions.add(future)
+            future.add_done_callback(functools.partial(completed, url))
+        await on_result(url, result, secs, on_written)
+
+    renewer = asyncio.create_task(renew())
+    try:
+        while True:
+            await scrape_sites(leased_urls(), app_config, logger, cache, limiter, finish)
+            remaining = await queue_call(jobs.unfinished)
+            if not remaining:
+                break
+            # Other nodes still hold leases; wait in case one of them dies and its URLs come back.
+            logger.info("job_queue_wait", extra={"owner": owner, **(await queue_call(jobs.counts))})
+            await asyncio.sleep(poll_seconds)
+    finally:
+        renewer.cancel()
+
+def open_checkpoint(app_config: configparser.ConfigParser, logger: logging.Logger, resume: Optional[str]) -> Optional[RunCheckpoint]:
+    """The checkpoint of the run being resumed, a fresh one for a new run, or None when checkpoints are off."""
+    directory = app_config.get('checkpoint', 'dir', fallback='cache/checkpoints')
+    if resume:
+        return RunCheckpoint(directory, resume, logger).load()
+    if not app_config.getboolean('checkpoint', 'enabled', fallback=True):
+        return None
+    return RunCheckpoint(directory, RunCheckpoint.new_run_id(), logger)
+
+async def run_scrape(app_config: configparser.ConfigParser, logger: logging.Logger, workers: int = 1, from_queue: bool = False,
+                     resume: Optional[str] = None, urls: Optional[List[str]] = None, session: Optional[aiohttp.ClientSession] = None,
+                     on_site: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    One complete scrape run: sites, outputs, caches, checkpoint and the post-run reports.
+    `urls` replaces the configured URL list, `session` is reused instead of opening a new one,
+    and `on_site` receives the run summary plus the finished `site` after every site.
+    Returns the run summary, or None when the run could not start.
+    """
+    jobs = open_job_queue(app_config) if from_queue else None
+    # The job queue keeps its own per-URL state, so queue nodes do not checkpoint.
+    try:
+        checkpoint = None if jobs else open_checkpoint(app_config, logger, resume)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("checkpoint_load_fail", extra={"run_id": resume, "err": str(e)})
+        print(f"Cannot resume run {resume}: no readable checkpoint ({e}).")
+        return None
+    if jobs:
+        urls = []
+    elif resume:
+        urls = checkpoint.remaining()
+        logger.info("run_resumed", extra={"run_id": checkpoint.run_id, "date": checkpoint.run_date.isoformat(), **checkpoint.counts()})
+        print(f"Resuming run {checkpoint.run_id}: {len(urls)} of {len(checkpoint.urls)} sites left.")
+    elif urls is None:
+        urls = io_handler.load_urls(app_config.get('scraper', 'url_list_path'), logger)
+    # A resumed run keeps writing under the date it started on, so its rows join that day's snapshot.
+    run_date = checkpoint.run_date if resume else datetime.date.today()
+    # The outputs open before a new run's checkpoint is created, so an output that cannot open leaves no orphaned run.
+    try:
+        sink = result_sink.ResultSink.from_config(app_config, logger, scrape_date=run_date)
+    except (OSError, SQLAlchemyError) as e:
+        logger.error("output_open_fail", extra={"err": str(e)})
+        print(f"Cannot open the outputs: {e}")
+        if jobs:
+            jobs.close()
+        if checkpoint:
+            checkpoint.close()
+        return None
+    if checkpoint and not resume:
+        checkpoint.start(urls, run_date)
+        logger.info("run_started", extra={"run_id": checkpoint.run_id, "urls": len(checkpoint.urls)})
+        print(f"Run ID: {checkpoint.run_id} (continue an interrupted run with --resume {checkpoint.run_id})")
     
     ui_handler = ui.UIHandler()
-    ui_handler.set_total_urls(len(urls))
+    ui_handler.set_total_urls(sum(jobs.counts(active_only=True).values()) if jobs else len(urls))
     
-    request_tracker: Deque[float] = collections.deque(maxlen=200)
-    all_bonuses = []
+    cache = run_cache.RunCache.from_config(app_config).load(logger)
+    fingerprints = FingerprintStore(cache)
+    completions: Set[asyncio.Future] = set()
+    metrics = MetricsStore.from_config(app_config, logger).load()
+    total_bonuses = 0
     failed_url_count = 0
-    
-    async with aiohttp.ClientSession() as session:
-        for url in urls:
-            success = False
-            bonuses_found = 0
-            cleaned_url = url
-            try:
-                bonuses_list, cleaned_url, success, bonuses_found = await process_url(url.strip(), app_config, logger, session, request_tracker)
-                if bonuses_list:
-                    all_bonuses.extend(bonuses_list)
-            except Exception as e:
-                success = False
-                failed_url_count += 1
-                logger.error(f"A task failed for URL {url.strip()}: {e}")
-            
-            ui_handler.update_site_progress(cleaned_url, success, bonuses_found, request_tracker)
+    # The UI only needs rate(): the limiter in-process, or a counter fed by the workers' request counts.
+    limiter = rate_limiter.RateLimiter.from_config(app_config)
+    request_rate = limiter if workers <= 1 else rate_limiter.SlidingWindowCounter(app_config.getint('rate_limit', 'window_seconds', fallback=60))
+
+    def summary() -> Dict[str, Any]:
+        return {"run_id": checkpoint.run_id if checkpoint else None, "total": ui_handler.total_urls, "processed": ui_handler.processed_count,
+                "total_bonuses": total_bonuses, "failed": failed_url_count, "unchanged": ui_handler.unchanged_count}
+
+    def report(url: str, success: bool, bonus_count: int, unchanged: bool = False) -> None:
+        if on_site:
+            on_site({**summary(), "site": {"url": url, "success": success, "bonus_count": bonus_count, "unchanged": unchanged,
+                                           "rate": round(request_rate.rate(), 2)}})
+
+    async def record(url: str, result, secs: float, on_done: Optional[Callable[[], Any]] = None):
+        nonlocal failed_url_count, total_bonuses
+        if result is None:
+            failed_url_count += 1
+            ui_handler.update_site_progress(url.strip(), False, 0, request_rate)
+            metrics.record(url.strip(), False, 0, secs=secs)
+            if checkpoint:
+                checkpoint.mark(url, "failed")
+            await sink.put([], on_done, site=SiteOutcome(io_handler.clean_url(url), SITE_FAILED))
+            report(url.strip(), False, 0)
+            return
+        bonuses_list, cleaned_url, success, bonuses_found, unchanged, fingerprint = result
+        previous = metrics.previous(cleaned_url)
+        metrics.record(cleaned_url, success, bonuses_found, unchanged, secs)
+        if not unchanged:
+            total_bonuses += bonuses_found
+
+        # The site is checkpointed and its fingerprint kept only once its rows are written, so neither
+        # a resume nor the next run can take a site whose rows were lost in a crash for done or unchanged.
+        def on_written() -> None:
+            if fingerprint:
+                fingerprints.remember(cleaned_url, fingerprint, bonuses_found)
+            if checkpoint:
+                checkpoint.mark(cleaned_url, "done" if success else "failed", bonuses_found)
+            if on_done:
+                on_done()
+        if not (fingerprint or checkpoint or on_done):
+            on_written = None
+        status = SITE_UNCHANGED if unchanged else SITE_SCRAPED if success else SITE_FAILED
+        # Blocks while the writers are behind, throttling the scrape instead of buffering.
+        await sink.put(bonuses_list or [], on_written, SiteOutcome(cleaned_url, status, bonuses_found))
+        ui_handler.update_site_progress(cleaned_url, success, bonuses_found, request_rate, unchanged,
+                                        previous.get("bonus_count") if previous else None)
+        report(cleaned_url, success, bonuses_found, unchanged)
+
+    await sink.start()
+    try:
+        if jobs:
+            await run_from_queue(jobs, app_config, logger, cache, limiter, record, completions)
+        elif workers > 1:
+            await run_workers(urls, workers, app_config, logger, cache, record, sink.put, request_rate)
+        else:
+            await scrape_sites(urls, app_config, logger, cache, limiter, record, session)
+    finally:
+        await sink.close()
+        # Jobs whose rows the close just flushed are completed before the queue is closed.
+        await asyncio.gather(*completions, return_exceptions=True)
+        await metrics.close()
+        # File and database work after the run goes to a thread, so a shared loop (the web runner's) keeps serving.
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, cache.save, logger)
+        if jobs:
+            jobs.close()
+        if checkpoint:
+            checkpoint.close()
+            logger.info("run_checkpoint", extra={"run_id": checkpoint.run_id, **checkpoint.counts()})
+
+    if app_config.getboolean('output', 'enable_db_output', fallback=False) and app_config.getboolean('output', 'enable_comparison_report', fallback=True):
+        await loop.run_in_executor(None, functools.partial(
+            comparison_report.write_comparison_report,
+            app_config.get('output', 'db_connection_string'),
+            app_config.get('output', 'comparison_report_dir', fallback='data'),
+            logger,
+            report_date=run_date,
+            include_persistent=app_config.getboolean('output', 'comparison_include_persistent', fallback=True),
+        ))
+    if app_config.getboolean('output', 'enable_db_output', fallback=False) and app_config.getboolean('output', 'enable_archive', fallback=True):
+        await loop.run_in_executor(None, archive.SnapshotArchive(app_config.get('output', 'archive_dir', fallback='data/archive'), logger).archive_from_db,
+                                   app_config.get('output', 'db_connection_string'), run_date)
 
-    if app_config.getboolean('output', 'enable_db_output'):
-        db_url = app_config.get('output', 'db_connection_string')
-        io_handler.write_bonuses_to_db(all_bonuses, db_url, logger)
+    ui_handler.print_final_summary(total_bonuses, failed_url_count)
+    logger.info(f"Scraping complete. Found {total_bonuses} total bonuses. {failed_url_count} URLs failed. {ui_handler.unchanged_count} unchanged.")
+    logger.info("claim_config_cache", extra=claim_config.default_classifier.stats())
+    return summary()
 
-    if app_config.getboolean('output', 'enable_csv_output'):
-        csv_path = app_config.get('output', 'csv_output_path')
-        io_handler.write_bonuses_to_csv(all_bonuses, csv_path, logger)
+async def main(workers: int = 1, from_queue: bool = False, resume: Optional[str] = None):
+    app_config = config.get_config()
+    logger = logger_config.setup_logger(app_config)
+    await run_scrape(app_config, logger, workers, from_queue, resume)
+
+def enqueue_run(run_id: Optional[str] = None) -> None:
+    """Loads the URL list into the shared job queue for a run, so nodes started with --from-queue can share it."""
+    app_config = config.get_config()
+    logger = logger_config.setup_logger(app_config)
+    urls = io_handler.load_urls(app_config.get('scraper', 'url_list_path'), logger)
+    jobs = open_job_queue(app_config)
+    run_id = run_id or time.strftime("%Y-%m-%d")
+    queued = jobs.enqueue(urls, run_id)
+    counts = jobs.counts()
+    jobs.close()
+    logger.info("job_queue_enqueued", extra={"run_id": run_id, "queued": queued, **counts})
+    print(f"Queued {queued} URLs for run {run_id}. Queue: {counts}")
 
-    ui_handler.print_final_summary(len(all_bonuses), failed_url_count)
-    logger.info(f"Scraping complete. Found {len(all_bonuses)} total bonuses. {failed_url_count} URLs failed.")
+async def serve_queue() -> None:
+    """Runs the job queue coordinator that nodes on other hosts reach through [queue] url."""
+    app_config = config.get_config()
+    logger = logger_config.setup_logger(app_config)
+    host = app_config.get('queue', 'listen_host', fallback='0.0.0.0')
+    port = app_config.getint('queue', 'listen_port', fallback=8765)
+    print(f"Serving the job queue {app_config.get('queue', 'path', fallback='data/jobs.db')} on {host}:{port}")
+    await JobQueueServer.from_config(app_config, logger).serve(host, port)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape bonus data for every URL in the configured list.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Scraper processes to run; URLs are sharded by host across them (default: 1).")
+    parser.add_argument("--enqueue", nargs="?", const="", metavar="RUN_ID",
+                        help="Load the URL list into the shared job queue for a run (default run ID: today) and exit.")
+    parser.add_argument("--serve-queue", action="store_true",
+                        help="Serve the job queue file over HTTP so nodes on other hosts can share it ([queue] url).")
+    parser.add_argument("--from-queue", action="store_true",
+                        help="Take URLs from the shared job queue instead of the URL list; run one per node.")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run, scraping only the sites its checkpoint does not mark done.")
+    args = parser.parse_args()
+    if args.enqueue is not None:
+        enqueue_run(args.enqueue or None)
+    elif args.serve_queue:
+        asyncio.run(serve_queue())
+    elif args.from_queue and args.workers > 1:
+        parser.error("--from-queue runs one process per node; start more nodes instead of --workers")
+    elif args.from_queue and args.resume:
+        parser.error("--resume does not apply to --from-queue; the job queue already tracks finished sites")
+    else:
+        asyncio.run(main(max(1, args.workers), args.from_queue, args.resume))
@@ -5,10 +5,18 @@ import logging
 from typing import Optional, List, Dict, Any
 
 from models import AuthData
+from rate_limiter import RateLimiter
+from resilience import HostGuard, guarded
+import json_codec
 
-async def get_bonuses(auth: AuthData, session: aiohttp.ClientSession, logger: logging.Logger) -> Optional[List[Dict[str, Any]]]:
+class AuthRejectedError(Exception):
+    """Raised when the API refuses the access token, e.g. because a cached login has expired."""
+
+async def get_bonuses(auth: AuthData, session: aiohttp.ClientSession, logger: logging.Logger, limiter: RateLimiter, guard: Optional[HostGuard] = None) -> Optional[List[Dict[str, Any]]]:
     """
     Fetches bonus data asynchronously.
+    Raises AuthRejectedError when the API rejects the token, so callers can log in again.
+    Transient failures are retried through `guard` when one is given.
     """
     payload = {
         "module": "/users/syncData",
@@ -19,22 +27,27 @@ async def get_bonuses(auth: AuthData, session: aiohttp.ClientSession, logger: lo
         "walletIsAdmin": ""
     }
     
-    try:
-        async with session.post(auth.api_url, data=payload, proxy=None, timeout=15, ssl=False) as response:
-            # ... (rest of the function is unchanged)
+    async def fetch(timeout: Optional[aiohttp.ClientTimeout]) -> List[Dict[str, Any]]:
+        async with session.post(auth.api_url, data=payload, timeout=timeout or session.timeout) as response:
+            if response.status in (401, 403):
+                raise AuthRejectedError(f"HTTP {response.status}")
             response.raise_for_status()
-            res_json = await response.json()
+            res_json = json_codec.loads(await response.read())
             
             if res_json.get("status") != "SUCCESS":
                 logger.warning("api_bonus_status_fail", {"url": auth.api_url, "response": res_json})
-                return None
+                raise AuthRejectedError(str(res_json.get("status")))
             
             bonus_l = res_json.get("data", {}).get("bonus", [])
             promo_l = res_json.get("data", {}).get("promotions", [])
             raw_data = (bonus_l if isinstance(bonus_l, list) else []) + (promo_l if isinstance(promo_l, list) else [])
             logger.debug("fetch_success", {"url": auth.api_url, "count": len(raw_data)})
             return raw_data
-            
+
+    try:
+        return await guarded(guard, limiter, auth.api_url, "sync", fetch)
+    except AuthRejectedError:
+        raise
     except Exception as e:
         logger.error("fetch_fail", {"url": auth.api_url, "err": str(e)})
         return None
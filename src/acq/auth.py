@@ -3,76 +3,150 @@
 import configparser
 import logging
 import re
-import time
 import asyncio
-from typing import Optional, Deque
+from typing import Any, Dict, Optional, Tuple
 from pydantic import ValidationError
 import aiohttp
 
 from models import AuthData
+from rate_limiter import RateLimiter
+from auth_cache import MerchantPageCache
+from resilience import HostGuard, guarded
+import json_codec
 
-async def get_auth(url: str, config: configparser.ConfigParser, logger: logging.Logger, session: aiohttp.ClientSession, request_tracker: Deque[float]) -> Optional[AuthData]:
+MERCHANT_PATTERN = re.compile(rb'var MERCHANTID = (\d+);\s*var MERCHANTNAME = ["\'](.*?)["\'];', re.IGNORECASE)
+SCAN_CHUNK_SIZE = 16 * 1024
+# Bytes carried over between chunks so a match split across a chunk boundary is still found.
+SCAN_OVERLAP = 1024
+# Unread remainders up to this size are drained so the connection can be reused for the login POST.
+SCAN_DRAIN_LIMIT = 64 * 1024
+
+async def scan_merchant_identity(response: aiohttp.ClientResponse, max_bytes: int) -> Tuple[Optional[Tuple[str, str]], int]:
+    """
+    Reads the page body chunk by chunk and stops as soon as MERCHANTID/MERCHANTNAME is found
+    or `max_bytes` have been read. Returns the (merchant_id, merchant_name) pair, or None, and the bytes read.
+    """
+    charset = response.charset or 'utf-8'
+    window = b""
+    bytes_read = 0
+    async for chunk in response.content.iter_chunked(SCAN_CHUNK_SIZE):
+        bytes_read += len(chunk)
+        window += chunk
+        match = MERCHANT_PATTERN.search(window)
+        if match:
+            try:
+                merchant_name = match.group(2).decode(charset, errors='replace')
+            except LookupError:
+                merchant_name = match.group(2).decode('utf-8', errors='replace')
+            return (match.group(1).decode('ascii'), merchant_name), bytes_read
+        if bytes_read >= max_bytes:
+            break
+        window = window[-SCAN_OVERLAP:]
+    return None, bytes_read
+
+async def release_or_close(response: aiohttp.ClientResponse, bytes_read: int) -> None:
+    """
+    Returns the connection to the pool when the rest of the body is small enough to drain,
+    otherwise closes it so the remaining bytes are never downloaded.
+    """
+    if response.content_length is not None and response.content_length - bytes_read > SCAN_DRAIN_LIMIT:
+        response.close()
+        return
+    drained = 0
+    while not response.content.at_eof():
+        chunk = await response.content.readany()
+        if not chunk:
+            break
+        drained += len(chunk)
+        if drained > SCAN_DRAIN_LIMIT:
+            response.close()
+            return
+    response.release()
+
+async def get_auth(url: str, config: configparser.ConfigParser, logger: logging.Logger, session: aiohttp.ClientSession, limiter: RateLimiter, page_cache: Optional[MerchantPageCache] = None, guard: Optional[HostGuard] = None) -> Optional[AuthData]:
     """
     Performs two-step authentication with detailed, specific exception handling.
+    When a page cache is given, step 1 is a conditional GET and a 304 reuses the cached merchant identity.
+    With a guard, each step is retried on transient errors and counted against the host's circuit breaker.
     """
+    max_scan_bytes = config.getint('scraper', 'merchant_scan_max_bytes', fallback=512 * 1024)
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    request_tracker.append(time.time())
 
     # Step 1: GET request
-    try:
-        async with session.get(url, headers=headers, proxy=None, timeout=15, ssl=False) as response:
+    async def fetch_identity(timeout: Optional[aiohttp.ClientTimeout]) -> Optional[Tuple[str, str]]:
+        cached_page = page_cache.get(url) if page_cache else None
+        get_headers = {**headers, **page_cache.validators(url)} if cached_page else headers
+        async with session.get(url, headers=get_headers, timeout=timeout or session.timeout) as response:
+            if response.status == 304 and cached_page:
+                logger.debug("auth_html_not_modified", extra={"url": url})
+                return cached_page["merchant_id"], cached_page["merchant_name"]
             response.raise_for_status()
-            html = await response.text()
-            if not html:
+            identity, bytes_read = await scan_merchant_identity(response, max_scan_bytes)
+            await release_or_close(response, bytes_read)
+            if not bytes_read:
                 logger.warning("auth_html_empty", extra={"url": url})
                 return None
-            match = re.search(r'var MERCHANTID = (\d+);\s*var MERCHANTNAME = ["\'](.*?)["\'];', html, re.IGNORECASE)
-            if not match:
-                logger.warning("auth_merch_id_fail", extra={"url": url})
+            if not identity:
+                logger.warning("auth_merch_id_fail", extra={"url": url, "bytes_read": bytes_read})
                 return None
-            merchant_id, merchant_name = match.groups()
+            if page_cache:
+                page_cache.put(url, identity[0], identity[1], response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return identity
+
+    try:
+        identity = await guarded(guard, limiter, url, "html", fetch_identity)
     except asyncio.TimeoutError:
         logger.error("auth_html_timeout", extra={"url": url})
         return None
     except aiohttp.ClientResponseError as e:
         logger.error("auth_html_http_error", extra={"url": url, "status": e.status, "err": e.message})
         return None
-    except aiohttp.ClientConnectorError as e:
+    except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
         logger.error("auth_html_connection_error", extra={"url": url, "err": str(e)})
         return None
+    if not identity:
+        return None
+    merchant_id, merchant_name = identity
 
     # Step 2: POST request
     api_url = f"{url}/api/v1/index.php"
     payload = {"module": "/users/login", "mobile": config.get('auth', 'username'), "password": config.get('auth', 'password'), "merchantId": merchant_id}
     
-    try:
-        async with session.post(api_url, data=payload, headers=headers, proxy=None, timeout=15, ssl=False) as response:
+    async def login(timeout: Optional[aiohttp.ClientTimeout]) -> Dict[str, Any]:
+        async with session.post(api_url, data=payload, headers=headers, timeout=timeout or session.timeout) as response:
             response.raise_for_status()
-            res_json = await response.json()
+            return json_codec.loads(await response.read())
+
+    try:
+        # Logging in creates a session on the site, so it is not retried.
+        res_json = await guarded(guard, limiter, url, "login", login, idempotent=False)
+
+        if res_json.get("status") != "SUCCESS":
+            logger.warning("auth_api_status_fail", extra={"url": api_url, "response": res_json})
+            return None
+
+        auth_payload = {
+            "merchant_id": merchant_id, "merchant_name": merchant_name,
+            "access_id": res_json.get("data", {}).get("id"),
+            "token": res_json.get("data", {}).get("token"),
+            "api_url": api_url
+        }
+        auth_data = AuthData.model_validate(auth_payload)
+        logger.debug("auth_success", extra={"url": url})
+        return auth_data
 
-            if res_json.get("status") != "SUCCESS":
-                logger.warning("auth_api_status_fail", extra={"url": api_url, "response": res_json})
-                return None
-            
-            auth_payload = {
-                "merchant_id": merchant_id, "merchant_name": merchant_name,
-                "access_id": res_json.get("data", {}).get("id"),
-                "token": res_json.get("data", {}).get("token"),
-                "api_url": api_url
-            }
-            auth_data = AuthData.model_validate(auth_payload)
-            logger.debug("auth_success", extra={"url": url})
-            return auth_data
-            
     except asyncio.TimeoutError:
         logger.error("auth_api_timeout", extra={"url": api_url})
         return None
     except aiohttp.ClientResponseError as e:
         logger.error("auth_api_http_error", extra={"url": api_url, "status": e.status, "err": e.message})
         return None
-    except aiohttp.ClientConnectorError as e:
+    except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
         logger.error("auth_api_connection_error", extra={"url": api_url, "err": str(e)})
         return None
+    except json_codec.JSONDecodeError as e:
+        logger.error("auth_api_decode_error", extra={"url": api_url, "err": str(e)})
+        return None
     except ValidationError as e:
         logger.error("auth_data_validation_error", extra={"url": api_url, "err": str(e)})
         return None
@@ -0,0 +1,79 @@
+# auth_cache.py
+
+import configparser
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+from pydantic import ValidationError
+
+from models import AuthData
+from run_cache import RunCache
+
+class AuthCache:
+    """Remembers validated AuthData per cleaned URL so reruns can skip the two-step login."""
+    SECTION = "auth"
+
+    def __init__(self, run_cache: RunCache, ttl_seconds: float):
+        self.run_cache = run_cache
+        self.ttl_seconds = ttl_seconds
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, run_cache: RunCache) -> "AuthCache":
+        return cls(run_cache, config.getfloat('cache', 'auth_ttl_seconds', fallback=6 * 3600))
+
+    def get(self, url: str) -> Optional[AuthData]:
+        entry = self.run_cache.get(self.SECTION, url)
+        if not isinstance(entry, dict):
+            return None
+        if time.time() - entry.get("stored_at", 0) > self.ttl_seconds:
+            self.invalidate(url)
+            return None
+        try:
+            return AuthData.model_validate(entry.get("auth"))
+        except ValidationError:
+            self.invalidate(url)
+            return None
+
+    def put(self, url: str, auth_data: AuthData) -> None:
+        self.run_cache.set(self.SECTION, url, {"auth": auth_data.model_dump(), "stored_at": time.time()})
+
+    def invalidate(self, url: str) -> None:
+        self.run_cache.delete(self.SECTION, url)
+
+class MerchantPageCache:
+    """
+    Remembers the MERCHANTID/MERCHANTNAME scraped from each host's landing page along
+    with its ETag/Last-Modified validators, so step 1 of the login can be a conditional GET.
+    """
+    SECTION = "merchant_pages"
+
+    def __init__(self, run_cache: RunCache):
+        self.run_cache = run_cache
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        entry = self.run_cache.get(self.SECTION, self._key(url))
+        if not isinstance(entry, dict) or not entry.get("merchant_id"):
+            return None
+        return entry
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Returns the conditional request headers for the cached page, if any."""
+        entry = self.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers['If-None-Match'] = entry["etag"]
+        if entry.get("last_modified"):
+            headers['If-Modified-Since'] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, merchant_id: str, merchant_name: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        self.run_cache.set(self.SECTION, self._key(url), {
+            "merchant_id": merchant_id, "merchant_name": merchant_name,
+            "etag": etag, "last_modified": last_modified,
+        })
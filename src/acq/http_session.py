@@ -0,0 +1,29 @@
+# http_session.py
+
+import configparser
+import aiohttp
+
+def session_timeout(config: configparser.ConfigParser) -> aiohttp.ClientTimeout:
+    """The default timeout of every request; per-host timeouts are derived from it."""
+    return aiohttp.ClientTimeout(
+        total=config.getfloat('http', 'total_timeout', fallback=30.0),
+        connect=config.getfloat('http', 'connect_timeout', fallback=5.0),
+        sock_read=config.getfloat('http', 'read_timeout', fallback=15.0),
+    )
+
+def create_session(config: configparser.ConfigParser) -> aiohttp.ClientSession:
+    """
+    Builds the shared aiohttp session from the [http] config section. The session owns
+    the connection pool and DNS cache, so every request of a run reuses warm connections.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.getint('http', 'connection_limit', fallback=100),
+        limit_per_host=config.getint('http', 'connection_limit_per_host', fallback=2),
+        keepalive_timeout=config.getfloat('http', 'keepalive_timeout', fallback=30.0),
+        use_dns_cache=True,
+        ttl_dns_cache=config.getint('http', 'dns_cache_ttl', fallback=300),
+        happy_eyeballs_delay=config.getfloat('http', 'happy_eyeballs_delay', fallback=0.25),
+        interleave=config.getint('http', 'happy_eyeballs_interleave', fallback=1),
+        ssl=config.getboolean('http', 'verify_ssl', fallback=False),
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=session_timeout(config))
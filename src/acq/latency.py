@@ -0,0 +1,100 @@
+# latency.py
+
+import configparser
+import math
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+import aiohttp
+
+from run_cache import RunCache
+import http_session
+
+PHASES = ("html", "login", "sync")
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty sample list."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1]
+
+class LatencyTracker:
+    """
+    Keeps the most recent request durations per host and phase (landing page GET, login POST,
+    syncData POST) in the run cache. Each host's timeouts come from its own p95, scaled and
+    clamped to [min_timeout, max_timeout], and its p50s estimate how long the site will take.
+    """
+    SECTION = "latency"
+
+    def __init__(self, run_cache: RunCache, base: aiohttp.ClientTimeout, multiplier: float = 3.0, min_timeout: float = 5.0, max_timeout: float = 30.0,
+                 min_samples: int = 3, max_samples: int = 32):
+        self.run_cache = run_cache
+        self.base = base
+        self.multiplier = max(1.0, multiplier)
+        self.min_timeout = max(0.1, min_timeout)
+        self.max_timeout = max(self.min_timeout, max_timeout)
+        self.min_samples = max(1, min_samples)
+        self.max_samples = max(self.min_samples, max_samples)
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, run_cache: RunCache) -> "LatencyTracker":
+        return cls(
+            run_cache,
+            http_session.session_timeout(config),
+            multiplier=config.getfloat('latency', 'timeout_multiplier', fallback=3.0),
+            min_timeout=config.getfloat('latency', 'min_timeout', fallback=5.0),
+            max_timeout=config.getfloat('latency', 'max_timeout', fallback=30.0),
+            min_samples=config.getint('latency', 'min_samples', fallback=3),
+            max_samples=config.getint('latency', 'max_samples', fallback=32),
+        )
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url.strip()).netloc or url.strip()
+
+    def samples(self, url: str, phase: str) -> List[float]:
+        entry = self.run_cache.get(self.SECTION, self.host(url))
+        values = entry.get(phase) if isinstance(entry, dict) else None
+        return values if isinstance(values, list) else []
+
+    def observe(self, url: str, phase: str, secs: float) -> None:
+        host = self.host(url)
+        entry = self.run_cache.get(self.SECTION, host)
+        entry = dict(entry) if isinstance(entry, dict) else {}
+        entry[phase] = (entry.get(phase) or [])[-(self.max_samples - 1):] + [round(secs, 3)]
+        self.run_cache.set(self.SECTION, host, entry)
+
+    def stats(self, url: str) -> Dict[str, Dict[str, float]]:
+        """p50/p95 per phase that has samples, e.g. {"sync": {"p50": 0.41, "p95": 2.3, "n": 12}}."""
+        result = {}
+        for phase in PHASES:
+            values = self.samples(url, phase)
+            if values:
+                result[phase] = {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "n": len(values)}
+        return result
+
+    def timeout(self, url: str, phase: str) -> aiohttp.ClientTimeout:
+        """The session timeout with `total` (and the read/connect limits) bounded by the host's history for this phase."""
+        values = self.samples(url, phase)
+        if len(values) < self.min_samples:
+            return self.base
+        total = min(self.max_timeout, max(self.min_timeout, percentile(values, 0.95) * self.multiplier))
+        return aiohttp.ClientTimeout(
+            total=total,
+            connect=min(self.base.connect, total) if self.base.connect else None,
+            sock_read=min(self.base.sock_read, total) if self.base.sock_read else None,
+            sock_connect=self.base.sock_connect,
+        )
+
+    def expected_secs(self, url: str) -> Optional[float]:
+        """Typical time for a full site visit, or None for a host never seen before."""
+        medians = [percentile(values, 0.5) for values in (self.samples(url, phase) for phase in PHASES) if values]
+        return sum(medians) if medians else None
+
+    def order(self, urls: Iterable[str]) -> List[str]:
+        """
+        Longest-expected-first ordering, which keeps a slow host from starting last and stretching
+        the end of the run. Unknown hosts go first since their duration is the least predictable;
+        ties keep file order.
+        """
+        keyed = [(self.expected_secs(url), url) for url in urls]
+        keyed.sort(key=lambda pair: float('inf') if pair[0] is None else pair[0], reverse=True)
+        return [url for _, url in keyed]
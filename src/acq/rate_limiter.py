@@ -0,0 +1,102 @@
+# rate_limiter.py
+
+import asyncio
+import configparser
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+class TokenBucket:
+    """A token bucket that hands out reservations instead of blocking, so callers never hold a lock while sleeping."""
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Takes one token and returns how many seconds the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+class SlidingWindowCounter:
+    """Counts events over the last `window_seconds` using one-second buckets; reads and writes are O(1) amortized."""
+    def __init__(self, window_seconds: int = 60):
+        self.window = max(1, int(window_seconds))
+        self._buckets = [0] * self.window
+        self._head = int(time.monotonic())
+        self._in_window = 0
+        self.total = 0
+
+    def _advance(self, now_sec: int) -> None:
+        elapsed = now_sec - self._head
+        if elapsed <= 0:
+            return
+        if elapsed >= self.window:
+            self._buckets = [0] * self.window
+            self._in_window = 0
+        else:
+            for sec in range(self._head + 1, now_sec + 1):
+                idx = sec % self.window
+                self._in_window -= self._buckets[idx]
+                self._buckets[idx] = 0
+        self._head = now_sec
+
+    def add(self, count: int = 1) -> None:
+        now_sec = int(time.monotonic())
+        self._advance(now_sec)
+        self._buckets[now_sec % self.window] += count
+        self._in_window += count
+        self.total += count
+
+    def rate(self) -> float:
+        """Average events per second over the window."""
+        self._advance(int(time.monotonic()))
+        return self._in_window / self.window
+
+class RateLimiter:
+    """
+    Shared request budget for every outgoing call. Each request must pass both the
+    global bucket and the bucket of its host. A rate of 0 disables that bucket.
+    """
+    def __init__(self, global_rps: float = 0.0, global_burst: int = 1, host_rps: float = 0.0,
+                 host_burst: int = 1, window_seconds: int = 60):
+        self._global = TokenBucket(global_rps, global_burst)
+        self.host_rps = host_rps
+        self.host_burst = host_burst
+        self._hosts: Dict[str, TokenBucket] = {}
+        self.window = SlidingWindowCounter(window_seconds)
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> "RateLimiter":
+        return cls(
+            global_rps=config.getfloat('rate_limit', 'global_rps', fallback=0.0),
+            global_burst=config.getint('rate_limit', 'global_burst', fallback=1),
+            host_rps=config.getfloat('rate_limit', 'host_rps', fallback=0.0),
+            host_burst=config.getint('rate_limit', 'host_burst', fallback=1),
+            window_seconds=config.getint('rate_limit', 'window_seconds', fallback=60),
+        )
+
+    async def acquire(self, url: str) -> None:
+        """Waits until a request to `url` fits both the global and the per-host budget."""
+        host = urlparse(url).netloc or url
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            bucket = self._hosts[host] = TokenBucket(self.host_rps, self.host_burst)
+        now = time.monotonic()
+        delay = max(self._global.reserve(now), bucket.reserve(now))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.window.add()
+
+    def rate(self) -> float:
+        """Requests per second actually sent over the sliding window."""
+        return self.window.rate()
+
+    @property
+    def total_requests(self) -> int:
+        return self.window.total
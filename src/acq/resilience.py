@@ -0,0 +1,207 @@
+# resilience.py
+
+import asyncio
+import configparser
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from urllib.parse import urlparse
+import aiohttp
+
+from run_cache import RunCache
+from rate_limiter import RateLimiter
+from latency import LatencyTracker
+
+T = TypeVar("T")
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for errors that a second attempt can plausibly fix."""
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = max(0.0, backoff_base)
+        self.backoff_max = max(self.backoff_base, backoff_max)
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> "RetryPolicy":
+        return cls(
+            max_attempts=config.getint('retry', 'max_attempts', fallback=3),
+            backoff_base=config.getfloat('retry', 'backoff_base', fallback=0.5),
+            backoff_max=config.getfloat('retry', 'backoff_max', fallback=8.0),
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after the given (1-based) failed attempt."""
+        return random.uniform(0.0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def unreachable(error: BaseException) -> bool:
+        # DNS failures, refused connections and bad certificates: asking again seconds later will not change them.
+        return isinstance(error, aiohttp.ClientConnectorError)
+
+    @classmethod
+    def retryable(cls, error: BaseException) -> bool:
+        # Timeouts, dropped connections, truncated bodies and gateway errors.
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUSES
+        if cls.unreachable(error):
+            return False
+        return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+
+    @classmethod
+    def host_fault(cls, error: BaseException) -> bool:
+        """Whether the error counts against the host's circuit breaker."""
+        return cls.retryable(error) or cls.unreachable(error)
+
+class CircuitBreakers:
+    """
+    Per-host circuit breakers kept in the run cache, counted in runs rather than requests, so they
+    fit a nightly schedule. A host fails a run when a request to it still fails after its retries
+    or cannot connect at all; later failures in the same run do not count again. After
+    `failure_threshold` consecutive failed runs the host is skipped for the next `cooldown_runs`
+    runs, then tried again; if that run fails too it is skipped for twice as many runs, up to
+    `max_cooldown_runs`. A run in which the host answered and never failed closes the breaker;
+    since a later request in the same run may still fail, that is settled at the host's first
+    check in a following run rather than on the successful request itself.
+    """
+    SECTION = "breakers"
+
+    def __init__(self, run_cache: RunCache, failure_threshold: int = 2, cooldown_runs: int = 1, max_cooldown_runs: int = 16,
+                 run_id: Optional[str] = None):
+        self.run_cache = run_cache
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_runs = max(1, cooldown_runs)
+        self.max_cooldown_runs = max(self.cooldown_runs, max_cooldown_runs)
+        # Tells this run's updates apart from earlier runs' in the shared cache entries.
+        self.run_id = run_id or f"{time.time():.6f}-{random.getrandbits(32):08x}"
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, run_cache: RunCache, run_id: Optional[str] = None) -> "CircuitBreakers":
+        return cls(
+            run_cache,
+            failure_threshold=config.getint('retry', 'breaker_failure_threshold', fallback=2),
+            cooldown_runs=config.getint('retry', 'breaker_cooldown_runs', fallback=1),
+            max_cooldown_runs=config.getint('retry', 'breaker_max_cooldown_runs', fallback=16),
+            run_id=run_id,
+        )
+
+    def _entry(self, host: str) -> Dict[str, Any]:
+        entry = self.run_cache.get(self.SECTION, host)
+        return dict(entry) if isinstance(entry, dict) else {}
+
+    def allow(self, host: str) -> bool:
+        """Whether this run may contact the host. The first check in a run uses up one of its skipped runs."""
+        entry = self._entry(host)
+        if entry.get("skip_run") == self.run_id:
+            return False
+        if entry.get("skip_left", 0) <= 0:
+            return True
+        entry["skip_left"] -= 1
+        entry["skip_run"] = self.run_id
+        self.run_cache.set(self.SECTION, host, entry)
+        return False
+
+    def cooldown(self, host: str) -> int:
+        """Runs the host is currently skipped for, counting the one that opened the breaker."""
+        return self._entry(host).get("cooldown", 0)
+
+    def _settle(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        # A run that succeeded against the host after its last failed run, and is over, clears its record.
+        ok_run = entry.get("ok_run")
+        if ok_run and ok_run != self.run_id and ok_run != entry.get("failed_run"):
+            return {}
+        return entry
+
+    def success(self, host: str) -> None:
+        """Notes that this run reached the host; the failure count is only reset once the run has ended without a failure."""
+        entry = self._settle(self._entry(host))
+        if not entry.get("failed_runs"):
+            self.run_cache.delete(self.SECTION, host)
+            return
+        if entry.get("failed_run") == self.run_id or entry.get("ok_run") == self.run_id:
+            return
+        entry["ok_run"] = self.run_id
+        self.run_cache.set(self.SECTION, host, entry)
+
+    def failure(self, host: str) -> bool:
+        """Counts this run as failed for the host, once per run, and returns True when that opened the breaker."""
+        entry = self._settle(self._entry(host))
+        if entry.get("failed_run") == self.run_id:
+            return False
+        entry["failed_run"] = self.run_id
+        entry["failed_runs"] = entry.get("failed_runs", 0) + 1
+        opened = entry["failed_runs"] >= self.failure_threshold
+        if opened:
+            last_cooldown = entry.get("cooldown")
+            entry["cooldown"] = min(self.max_cooldown_runs, last_cooldown * 2) if last_cooldown else self.cooldown_runs
+            entry["skip_left"] = entry["cooldown"]
+            # The rest of this run skips the host too, without using up one of the skipped runs.
+            entry["skip_run"] = self.run_id
+        self.run_cache.set(self.SECTION, host, entry)
+        return opened
+
+Attempt = Callable[[Optional[aiohttp.ClientTimeout]], Awaitable[T]]
+
+class HostGuard:
+    """
+    Runs each request attempt under the retry policy and reports its outcome to the host's breaker.
+    With a latency tracker, each attempt gets the host's own timeout for the phase and its duration
+    is recorded; a timed-out attempt is recorded too, so the next timeout for that host widens.
+    """
+    def __init__(self, policy: RetryPolicy, breakers: Optional[CircuitBreakers], logger: logging.Logger,
+                 latency: Optional[LatencyTracker] = None):
+        self.policy = policy
+        self.breakers = breakers
+        self.logger = logger
+        self.latency = latency
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    def allow(self, url: str) -> bool:
+        return self.breakers is None or self.breakers.allow(self.host(url))
+
+    async def call(self, url: str, phase: str, attempt: Attempt, limiter: RateLimiter, idempotent: bool = True) -> T:
+        """
+        Awaits `attempt(timeout)` until it succeeds, fails with a non-retryable error, or runs out of attempts.
+        A request that is not idempotent is attempted once, since a retry after a timeout could repeat it.
+        """
+        host = self.host(url)
+        max_attempts = self.policy.max_attempts if idempotent else 1
+        number = 0
+        while True:
+            number += 1
+            await limiter.acquire(url)
+            timeout = self.latency.timeout(url, phase) if self.latency else None
+            started = time.monotonic()
+            try:
+                result = await attempt(timeout)
+            except Exception as e:
+                if self.latency and isinstance(e, asyncio.TimeoutError):
+                    self.latency.observe(url, phase, time.monotonic() - started)
+                if not self.policy.retryable(e) or number >= max_attempts:
+                    if self.breakers and self.policy.host_fault(e) and self.breakers.failure(host):
+                        self.logger.warning("circuit_opened", extra={"host": host, "skip_runs": self.breakers.cooldown(host)})
+                    raise
+                delay = self.policy.delay(number)
+                self.logger.info("request_retry", extra={"url": url, "attempt": number, "delay": round(delay, 3), "err": str(e) or type(e).__name__})
+                await asyncio.sleep(delay)
+                continue
+            if self.latency:
+                self.latency.observe(url, phase, time.monotonic() - started)
+            if self.breakers:
+                self.breakers.success(host)
+            return result
+
+async def guarded(guard: Optional[HostGuard], limiter: RateLimiter, url: str, phase: str, attempt: Attempt, idempotent: bool = True) -> Any:
+    """
+    Runs `attempt` through `guard` when one is configured, otherwise once with the session's timeout.
+    Either way the rate limiter is passed before every attempt.
+    """
+    if guard is None:
+        await limiter.acquire(url)
+        return await attempt(None)
+    return await guard.call(url, phase, attempt, limiter, idempotent)
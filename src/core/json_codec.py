@@ -0,0 +1,27 @@
+# json_codec.py
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; the stdlib decoder is used when it is not installed.
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both backends.
+JSONDecodeError = json.JSONDecodeError
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Decodes JSON from raw response bytes or a string."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """Encodes to a JSON string. Raises TypeError for values that cannot be serialized."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode('utf-8')
+    return json.dumps(obj, sort_keys=sort_keys)
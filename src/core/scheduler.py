@@ -0,0 +1,96 @@
+# scheduler.py
+
+import asyncio
+import heapq
+import random
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, TypeVar, Union
+from urllib.parse import urlparse
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+class HostPacer:
+    """
+    Enforces a randomized gap between consecutive requests to the same host.
+    Hosts are paced independently, so concurrent work on different sites never waits on each other.
+    """
+    def __init__(self, min_delay: float, max_delay: float):
+        self.min_delay = max(0.0, min_delay)
+        self.max_delay = max(self.min_delay, max_delay)
+        self._next_allowed: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def wait(self, host: str) -> None:
+        """Sleeps until the host may be contacted again, then reserves the next slot."""
+        lock = self._locks.get(host)
+        if lock is None:
+            lock = self._locks[host] = asyncio.Lock()
+        async with lock:
+            delay = self._next_allowed.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_allowed[host] = time.monotonic() + random.uniform(self.min_delay, self.max_delay)
+
+async def run_bounded(items: Union[Iterable[T], AsyncIterable[T]], worker: Callable[[T], Awaitable[R]], concurrency: int,
+                      on_result: Callable[[T, R], Awaitable[Any]]) -> None:
+    """
+    Runs `worker` over `items` with at most `concurrency` calls in flight.
+    `on_result` is awaited for each item in completion order. Items are pulled lazily,
+    so `items` may be a generator of any length, or an async generator that does I/O to produce them.
+    """
+    if hasattr(items, "__aiter__"):
+        iterator = items.__aiter__()
+        # Only one worker may be inside the async generator at a time.
+        pulling = asyncio.Lock()
+
+        async def _items():
+            while True:
+                async with pulling:
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                yield item
+    else:
+        iterator = iter(items)
+
+        async def _items():
+            for item in iterator:
+                yield item
+
+    async def _drain() -> None:
+        async for item in _items():
+            result = await worker(item)
+            await on_result(item, result)
+
+    workers = [asyncio.create_task(_drain()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+
+def _host(url: str) -> str:
+    return urlparse(url.strip()).netloc or url.strip()
+
+def shard_by_host(urls: Iterable[str], shards: int, weight: Callable[[str], float] = lambda url: 1.0) -> List[List[str]]:
+    """
+    Splits `urls` into `shards` lists so every URL of a host lands in the same shard, keeping
+    per-host pacing and caches local to one process. Hosts are placed heaviest first onto the
+    lightest shard; URLs keep their original order within a shard.
+    """
+    urls = list(urls)
+    hosts: Dict[str, List[str]] = {}
+    for url in urls:
+        hosts.setdefault(_host(url), []).append(url)
+    loads = [(0.0, index) for index in range(max(1, shards))]
+    assigned: Dict[str, int] = {}
+    for host in sorted(hosts, key=lambda host: sum(weight(url) for url in hosts[host]), reverse=True):
+        load, index = heapq.heappop(loads)
+        assigned[host] = index
+        heapq.heappush(loads, (load + sum(weight(url) for url in hosts[host]), index))
+    result: List[List[str]] = [[] for _ in range(max(1, shards))]
+    for url in urls:
+        result[assigned[_host(url)]].append(url)
+    return result
@@ -0,0 +1,162 @@
+# archive.py
+
+import datetime
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, Float, Integer, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from db_writer import DB_FIELDS, covered_sites, create_db_engine
+from models import Bonus
+
+PARTITION_PATTERN = re.compile(r"^bonuses_(\d{4}-\d{2}-\d{2})\.sqlite$")
+INSERT_CHUNK_ROWS = 5000
+AGGREGATES = {"count", "sum", "avg", "min", "max"}
+
+def _sqlite_type(column) -> str:
+    if isinstance(column.type, (Boolean, Integer)):
+        return "INTEGER"
+    if isinstance(column.type, Float):
+        return "REAL"
+    return "TEXT"
+
+class SnapshotArchive:
+    """
+    Append-only history of daily bonus snapshots, one SQLite file per scrape date under `root`.
+    Writing a day touches only that day's file, and reads open just the partitions in the
+    requested date range and select just the requested columns. Booleans read back as 0/1.
+    """
+    def __init__(self, root: str, logger: logging.Logger):
+        self.root = root
+        self.logger = logger
+        table = Bonus.__table__
+        self._columns_ddl = ", ".join(f"{name} {_sqlite_type(table.c[name])}" for name in DB_FIELDS)
+
+    def partition_path(self, day: datetime.date) -> str:
+        return os.path.join(self.root, f"bonuses_{day.isoformat()}.sqlite")
+
+    def dates(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> List[datetime.date]:
+        """Archived dates within [start, end], oldest first; found from file names without opening them."""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        days = []
+        for name in names:
+            match = PARTITION_PATTERN.match(name)
+            if not match:
+                continue
+            day = datetime.date.fromisoformat(match.group(1))
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+        return sorted(days)
+
+    def write_day(self, day: datetime.date, rows: Iterable[Sequence]) -> int:
+        """
+        Replaces the partition for `day` with `rows` (values in DB_FIELDS order). The file is built
+        beside the archive and renamed into place, so readers never see a half-written day.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        count = 0
+        try:
+            conn = sqlite3.connect(tmp_path)
+            try:
+                # The file is private until renamed, so journaling and fsyncs buy nothing here.
+                conn.execute("PRAGMA journal_mode=OFF")
+                conn.execute("PRAGMA synchronous=OFF")
+                conn.execute(f"CREATE TABLE bonuses ({self._columns_ddl}, PRIMARY KEY (url, id)) WITHOUT ROWID")
+                insert = f"INSERT OR REPLACE INTO bonuses VALUES ({', '.join('?' * len(DB_FIELDS))})"
+                chunk: List[Sequence] = []
+                for row in rows:
+                    chunk.append(tuple(row))
+                    if len(chunk) >= INSERT_CHUNK_ROWS:
+                        conn.executemany(insert, chunk)
+                        count += len(chunk)
+                        chunk = []
+                if chunk:
+                    conn.executemany(insert, chunk)
+                    count += len(chunk)
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(tmp_path, self.partition_path(day))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return count
+
+    def _scan(self, start: datetime.date, end: datetime.date, sql: str, params: Sequence) -> Iterator[Tuple]:
+        for day in self.dates(start, end):
+            label = day.isoformat()
+            conn = sqlite3.connect(f"file:{self.partition_path(day)}?mode=ro", uri=True)
+            try:
+                for row in conn.execute(sql, params):
+                    yield (label,) + row
+            finally:
+                conn.close()
+
+    def query(self, start: datetime.date, end: datetime.date, columns: Optional[Sequence[str]] = None,
+              urls: Optional[Sequence[str]] = None) -> Iterator[Tuple]:
+        """
+        Yields (scrape_date, *columns) for every archived bonus between `start` and `end` inclusive.
+        `columns` defaults to all fields; `urls` restricts the read to those sites through the primary key.
+        """
+        columns = list(columns or DB_FIELDS)
+        unknown = [name for name in columns if name not in DB_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown archive columns: {', '.join(unknown)}")
+        sql = f"SELECT {', '.join(columns)} FROM bonuses"
+        params: List[str] = list(urls or [])
+        if urls:
+            sql += f" WHERE url IN ({', '.join('?' * len(params))})"
+        return self._scan(start, end, sql, params)
+
+    def daily_aggregate(self, start: datetime.date, end: datetime.date, column: str, func: str = "sum",
+                        by_url: bool = False) -> Iterator[Tuple]:
+        """
+        Yields (scrape_date, [url,] value) with `func` applied to `column` inside each partition,
+        so a trend over months returns one row per day (or per day and site) instead of every bonus.
+        """
+        func = func.lower()
+        if func not in AGGREGATES:
+            raise ValueError(f"Unsupported aggregate: {func}")
+        if column not in DB_FIELDS:
+            raise ValueError(f"Unknown archive column: {column}")
+        sql = f"SELECT {'url, ' if by_url else ''}{func}({column}) FROM bonuses"
+        if by_url:
+            sql += " GROUP BY url"
+        return self._scan(start, end, sql, [])
+
+    def archive_from_db(self, db_url: str, day: Optional[datetime.date] = None) -> int:
+        """
+        Archives the snapshot for `day` from the bonuses table: the day's rows of every site the run
+        has data for. The writer carries unchanged sites forward to the day, so the partition is
+        complete, and reading it costs the day's rows found through site_runs and (url, scrape_date).
+        """
+        day = day or datetime.date.today()
+        table = Bonus.__table__
+        engine = create_db_engine(db_url)
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                sites = covered_sites(conn, day).subquery("sites")
+                query = (select(*(table.c[name] for name in DB_FIELDS))
+                         .select_from(table.join(sites, sites.c.url == table.c.url))
+                         .where(table.c.scrape_date == day))
+                result = conn.execution_options(stream_results=True, yield_per=INSERT_CHUNK_ROWS).execute(query)
+                rows = self.write_day(day, result)
+        except (SQLAlchemyError, OSError, sqlite3.Error) as e:
+            self.logger.error("archive_write_fail", extra={"date": day.isoformat(), "err": str(e)})
+            return 0
+        finally:
+            engine.dispose()
+        self.logger.info("archive_write_done", extra={"date": day.isoformat(), "rows": rows, "secs": round(time.perf_counter() - started, 3)})
+        return rows
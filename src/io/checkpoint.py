@@ -0,0 +1,114 @@
+# checkpoint.py
+
+import datetime
+import itertools
+import logging
+import os
+from typing import Dict, List, Optional
+
+import json_codec
+from io_handler import clean_url
+
+STATUSES = ("done", "failed")
+
+class RunCheckpoint:
+    """
+    Durable progress of one scrape run as a JSON Lines file: a header with the run ID, the run's
+    scrape date and its URL list, then one line per finished site. Lines are fsynced as they are
+    written and the latest line for a URL wins, so after a crash or reboot the file says exactly
+    which sites still need scraping. Sites without a line are pending; failed sites are retried
+    on resume.
+    """
+    def __init__(self, directory: str, run_id: str, logger: logging.Logger):
+        self.directory = directory
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"run_{run_id}.jsonl")
+        self.logger = logger
+        self.run_date = datetime.date.today()
+        self.urls: List[str] = []
+        self._status: Dict[str, Dict] = {}
+        self._file = None
+
+    @staticmethod
+    def new_run_id() -> str:
+        return datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    @classmethod
+    def list_runs(cls, directory: str) -> List[str]:
+        """Run IDs with a checkpoint in `directory`, newest first."""
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return sorted((name[4:-6] for name in names if name.startswith("run_") and name.endswith(".jsonl")), reverse=True)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def start(self, urls: List[str], run_date: Optional[datetime.date] = None) -> "RunCheckpoint":
+        """Creates the checkpoint for a new run over `urls`."""
+        self.run_date = run_date or datetime.date.today()
+        self.urls = list(dict.fromkeys(clean_url(url) for url in urls))
+        os.makedirs(self.directory, exist_ok=True)
+        base_id = self.run_id
+        for n in itertools.count(2):
+            try:
+                self._file = open(self.path, 'x', encoding='utf-8')
+                break
+            except FileExistsError:
+                # Runs started within the same second (back-to-back web jobs) get a numbered ID.
+                self.run_id = f"{base_id}-{n}"
+                self.path = os.path.join(self.directory, f"run_{self.run_id}.jsonl")
+        self._append({"run_id": self.run_id, "date": self.run_date.isoformat(), "urls": self.urls})
+        return self
+
+    def load(self) -> "RunCheckpoint":
+        """Reads an existing checkpoint and reopens it for appending. Raises FileNotFoundError for an unknown run."""
+        with open(self.path, 'rb') as f:
+            lines = f.read().splitlines()
+        header = json_codec.loads(lines[0]) if lines else {}
+        self.run_date = datetime.date.fromisoformat(header["date"])
+        self.urls = header.get("urls", [])
+        for line in lines[1:]:
+            try:
+                entry = json_codec.loads(line)
+            except ValueError:
+                # A crash can leave the last line half written; that site is simply still pending.
+                continue
+            if isinstance(entry, dict) and entry.get("status") in STATUSES:
+                self._status[entry["url"]] = entry
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if lines and not lines[-1].endswith(b"}"):
+            self._file.write("\n")
+        return self
+
+    def _append(self, entry: Dict) -> None:
+        try:
+            self._file.write(json_codec.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except (OSError, ValueError) as e:
+            self.logger.error("checkpoint_write_fail", extra={"path": self.path, "err": str(e)})
+
+    def mark(self, url: str, status: str, bonus_count: int = 0) -> None:
+        """Records a finished site. Call it only once the site's rows have reached every output."""
+        entry = {"url": clean_url(url), "status": status, "bonus_count": bonus_count}
+        self._status[entry["url"]] = entry
+        if self._file is not None:
+            self._append(entry)
+
+    def remaining(self) -> List[str]:
+        """URLs of the run not yet done, in their original order."""
+        return [url for url in self.urls if self._status.get(url, {}).get("status") != "done"]
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"done": 0, "failed": 0}
+        for entry in self._status.values():
+            counts[entry["status"]] += 1
+        counts["pending"] = len(self.urls) - counts["done"] - counts["failed"]
+        return counts
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
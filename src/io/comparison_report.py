@@ -0,0 +1,110 @@
+# comparison_report.py
+
+import csv
+import datetime
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import and_, case, exists, func, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+
+from db_writer import DB_FIELDS, covered_sites, create_db_engine
+from models import SITE_FAILED, Bonus, SiteRun
+
+REPORT_FIELDS = ["status", "scrape_date"] + DB_FIELDS
+STREAM_ROWS = 5000
+
+def _side(table, compared, name: str, own_date: datetime.date, other_date: datetime.date, status_if_missing: str, include_persistent: bool):
+    """
+    Rows of the compared sites on `own_date`, labelled by whether the same (url, id) exists on
+    `other_date`. Rows are found through the (url, scrape_date) index and each membership test
+    is a single probe of the unique (url, id, scrape_date) index.
+    """
+    rows = table.alias(name)
+    other = table.alias(name + "_other")
+    in_other = exists().where(and_(other.c.url == rows.c.url, other.c.id == rows.c.id, other.c.scrape_date == other_date))
+    status = case((in_other, literal("persistent")), else_=literal(status_if_missing)) if include_persistent else literal(status_if_missing)
+    query = (select(status.label("status"), rows.c.scrape_date, *(rows.c[field] for field in DB_FIELDS))
+             .select_from(rows.join(compared, compared.c.url == rows.c.url))
+             .where(rows.c.scrape_date == own_date))
+    return query if include_persistent else query.where(~in_other)
+
+def previous_run_date(conn: Connection, before: datetime.date) -> Optional[datetime.date]:
+    sites = SiteRun.__table__
+    previous = conn.execute(select(func.max(sites.c.scrape_date))
+                            .where(sites.c.scrape_date < before, sites.c.status != SITE_FAILED)).scalar()
+    if previous is None:
+        table = Bonus.__table__
+        previous = conn.execute(select(func.max(table.c.scrape_date)).where(table.c.scrape_date < before)).scalar()
+    return previous
+
+def compared_sites(conn: Connection, current: datetime.date, previous: datetime.date):
+    """Subquery of the sites with data on both dates; a site missing from either run has nothing to compare."""
+    current_sites = covered_sites(conn, current).subquery("current_sites")
+    previous_sites = covered_sites(conn, previous).subquery("previous_sites")
+    return (select(current_sites.c.url)
+            .select_from(current_sites.join(previous_sites, previous_sites.c.url == current_sites.c.url))
+            .subquery("compared"))
+
+def iter_comparison(conn: Connection, current: datetime.date, previous: datetime.date, include_persistent: bool = True) -> Iterable[Dict]:
+    """
+    Streams (status, row) pairs for the day-over-day comparison, keyed on (url, id):
+    'new' and 'persistent' rows come from the current run, 'expired' rows from the previous one.
+    Only sites the runs on both dates have data for are compared, so a site that failed, was
+    dropped from the list or was first scraped on one of the days reports nothing.
+    """
+    table = Bonus.__table__
+    compared = compared_sites(conn, current, previous)
+    current_side = _side(table, compared, "cur", current, previous, "new", include_persistent)
+    # Bonuses present on both days were already reported from the current side.
+    expired_side = _side(table, compared, "prev", previous, current, "expired", False)
+    for query in (current_side, expired_side):
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_ROWS).execute(query)
+        for partition in result.partitions():
+            yield from partition
+
+def write_comparison_report(db_url: str, report_dir: str, logger: logging.Logger,
+                            report_date: Optional[datetime.date] = None, include_persistent: bool = True) -> Optional[str]:
+    """
+    Writes comparison_report_[date].csv from the bonuses table without loading either day into memory.
+    Returns the report path, or None when there is no earlier run to compare against.
+    """
+    report_date = report_date or datetime.date.today()
+    engine = create_db_engine(db_url)
+    started = time.perf_counter()
+    counts = {"new": 0, "expired": 0, "persistent": 0}
+    try:
+        with engine.connect() as conn:
+            previous = previous_run_date(conn, report_date)
+            if previous is None:
+                logger.info("comparison_report_skip", extra={"date": report_date.isoformat(), "reason": "no_previous_run"})
+                return None
+            os.makedirs(report_dir or ".", exist_ok=True)
+            path = os.path.join(report_dir, f"comparison_report_{report_date.isoformat()}.csv")
+            sites = conn.execute(select(func.count()).select_from(compared_sites(conn, report_date, previous))).scalar()
+            fd, tmp_path = tempfile.mkstemp(dir=report_dir or ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(REPORT_FIELDS)
+                    for row in iter_comparison(conn, report_date, previous, include_persistent):
+                        counts[row[0]] += 1
+                        writer.writerow(row)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+    except (SQLAlchemyError, OSError) as e:
+        logger.error("comparison_report_fail", extra={"date": report_date.isoformat(), "err": str(e)})
+        return None
+    finally:
+        engine.dispose()
+    logger.info("comparison_report_done", extra={
+        "path": path, "date": report_date.isoformat(), "previous": previous.isoformat(), "sites": sites,
+        "secs": round(time.perf_counter() - started, 3), **counts,
+    })
+    return path
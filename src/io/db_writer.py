@@ -0,0 +1,196 @@
+# db_writer.py
+
+import datetime
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import and_, create_engine, event, exists, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+
+from models import SITE_FAILED, SITE_SCRAPED, SITE_UNCHANGED, Base, Bonus, BonusRecord, SiteOutcome, SiteRun
+
+# Values taken from each BonusRecord; scrape_date and content_hash are added by the writer.
+DB_FIELDS = list(BonusRecord._fields)
+NATURAL_KEY = ["url", "id", "scrape_date"]
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _tune_sqlite(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def create_db_engine(db_url: str) -> Engine:
+    """
+    Creates the engine and the tables; SQLite connections are switched to WAL with relaxed fsyncs,
+    and the directory of a SQLite file is created first.
+    """
+    engine = create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        database = engine.url.database
+        if database and database != ":memory:" and not database.startswith("file:") and os.path.dirname(database):
+            os.makedirs(os.path.dirname(database), exist_ok=True)
+        event.listen(engine, "connect", _tune_sqlite)
+    Base.metadata.create_all(engine)
+    # create_all skips tables that already exist, so indexes added later are created here.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    return engine
+
+def covered_sites(conn: Connection, day: datetime.date):
+    """
+    Query of the sites a run has data for on `day`: scraped or unchanged, not failed. Their bonuses
+    for the day are their rows with that scrape_date, since unchanged sites are carried forward.
+    Days written before site_runs existed fall back to the sites with rows on that day.
+    """
+    sites = SiteRun.__table__
+    if conn.execute(select(sites.c.url).where(sites.c.scrape_date == day).limit(1)).first() is not None:
+        return select(sites.c.url).where(sites.c.scrape_date == day, sites.c.status != SITE_FAILED)
+    table = Bonus.__table__
+    return select(table.c.url).where(table.c.scrape_date == day).distinct()
+
+def content_hash(values: Iterable[Any]) -> str:
+    """Stable digest of a row's values, used to skip rewriting rows that did not change."""
+    return hashlib.blake2b(repr(tuple(values)).encode('utf-8'), digest_size=16).hexdigest()
+
+class BonusDBWriter:
+    """
+    Bulk writer for the bonuses table. Each batch is one transaction made of
+    chunked executemany statements through SQLAlchemy Core, bypassing the ORM unit of work.
+    On SQLite and PostgreSQL rows are upserted on (url, id, scrape_date) and only rewritten
+    when their content hash changed, so re-running a day is idempotent. The same transaction
+    deletes the day's rows a re-scraped site no longer returns, records each site's outcome in
+    site_runs and copies the last snapshot of unchanged sites forward to the day, so every site
+    covered by a run has exactly that day's rows.
+    """
+    def __init__(self, db_url: str, logger: logging.Logger, chunk_rows: int = 1000, scrape_date: Optional[datetime.date] = None):
+        self.logger = logger
+        self.chunk_rows = max(1, chunk_rows)
+        self.scrape_date = scrape_date or datetime.date.today()
+        self.engine = create_db_engine(db_url)
+        self.table = Bonus.__table__
+        self.statement = self._build_statement()
+        self.site_statement = self._build_site_statement()
+        self.rows_written = 0
+        self.rows_carried = 0
+        self.rows_dropped = 0
+        self.seconds = 0.0
+
+    def _build_statement(self):
+        dialect_insert = _UPSERT_DIALECTS.get(self.engine.dialect.name)
+        if dialect_insert is None:
+            self.logger.warning("db_upsert_unsupported", extra={"dialect": self.engine.dialect.name})
+            return self.table.insert()
+        stmt = dialect_insert(self.table)
+        excluded = stmt.excluded
+        return stmt.on_conflict_do_update(
+            index_elements=NATURAL_KEY,
+            set_={name: excluded[name] for name in DB_FIELDS + ["content_hash", "created_at"] if name not in NATURAL_KEY},
+            where=self.table.c.content_hash != excluded.content_hash,
+        )
+
+    def _build_site_statement(self):
+        sites = SiteRun.__table__
+        dialect_insert = _UPSERT_DIALECTS.get(self.engine.dialect.name)
+        if dialect_insert is None:
+            return sites.insert()
+        stmt = dialect_insert(sites)
+        excluded = stmt.excluded
+        # A failed re-run of a day does not hide the data an earlier run of that day stored.
+        return stmt.on_conflict_do_update(
+            index_elements=["url", "scrape_date"],
+            set_={"status": excluded.status, "bonus_count": excluded.bonus_count, "updated_at": excluded.updated_at},
+            where=(excluded.status != SITE_FAILED) | (sites.c.status == SITE_FAILED),
+        )
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_written / self.seconds if self.seconds else 0.0
+
+    def to_row(self, bonus: BonusRecord) -> Dict[str, Any]:
+        """The only place a processed bonus becomes a table row."""
+        row = dict(zip(DB_FIELDS, bonus))
+        row["content_hash"] = content_hash(bonus)
+        row["scrape_date"] = self.scrape_date
+        return row
+
+    def _snapshot_date(self, conn: Connection, url: str) -> Optional[datetime.date]:
+        """The site's latest day with data on or before this writer's day."""
+        sites = SiteRun.__table__
+        day = conn.execute(select(func.max(sites.c.scrape_date))
+                           .where(sites.c.url == url, sites.c.scrape_date <= self.scrape_date, sites.c.status != SITE_FAILED)).scalar()
+        if day is None:
+            # Bonuses written before site_runs existed.
+            day = conn.execute(select(func.max(self.table.c.scrape_date))
+                               .where(self.table.c.url == url, self.table.c.scrape_date <= self.scrape_date)).scalar()
+        return day
+
+    def _carry_forward(self, conn: Connection, url: str) -> int:
+        """Copies an unchanged site's last snapshot to this writer's day inside the database."""
+        source = self._snapshot_date(conn, url)
+        if source is None or source == self.scrape_date:
+            return 0
+        table = self.table
+        existing = table.alias("existing")
+        columns = DB_FIELDS + ["content_hash"]
+        rows = (select(*(table.c[name] for name in columns), literal(self.scrape_date, table.c.scrape_date.type),
+                       literal(datetime.datetime.utcnow(), table.c.created_at.type))
+                .where(table.c.url == url, table.c.scrape_date == source,
+                       ~exists().where(and_(existing.c.url == table.c.url, existing.c.id == table.c.id,
+                                            existing.c.scrape_date == self.scrape_date))))
+        return conn.execute(table.insert().from_select(columns + ["scrape_date", "created_at"], rows)).rowcount
+
+    def _drop_missing(self, conn: Connection, url: str, ids: List[str]) -> int:
+        """Deletes a scraped site's rows for this writer's day whose IDs its latest scrape did not return."""
+        table = self.table
+        stmt = table.delete().where(table.c.url == url, table.c.scrape_date == self.scrape_date)
+        if ids:
+            stmt = stmt.where(table.c.id.notin_(ids))
+        return conn.execute(stmt).rowcount
+
+    def write(self, bonuses: Iterable[BonusRecord], sites: Sequence[SiteOutcome] = ()) -> int:
+        """
+        Writes a batch of bonuses and the outcomes of the sites it completes in one transaction,
+        and returns the bonus rows written. A site's rows always arrive in the batch that carries
+        its outcome, so a scraped site's rows for the day are replaced by exactly the batch's.
+        Raises SQLAlchemyError when the transaction fails, in which case nothing of the batch is stored.
+        """
+        rows: List[Dict[str, Any]] = [self.to_row(b) for b in bonuses]
+        if not rows and not sites:
+            return 0
+        started = time.perf_counter()
+        carried = dropped = 0
+        now = datetime.datetime.utcnow()
+        ids_by_url: Dict[str, List[str]] = {}
+        for row in rows:
+            ids_by_url.setdefault(row["url"], []).append(row["id"])
+        with self.engine.begin() as conn:
+            for start in range(0, len(rows), self.chunk_rows):
+                conn.execute(self.statement, rows[start:start + self.chunk_rows])
+            for site in sites:
+                if site.status == SITE_SCRAPED:
+                    # A same-day rerun, resume or web job must not leave bonuses the site has since withdrawn.
+                    dropped += self._drop_missing(conn, site.url, ids_by_url.get(site.url, []))
+                elif site.status == SITE_UNCHANGED:
+                    carried += self._carry_forward(conn, site.url)
+            if sites:
+                conn.execute(self.site_statement, [{"url": site.url, "scrape_date": self.scrape_date, "status": site.status,
+                                                    "bonus_count": site.bonus_count, "updated_at": now} for site in sites])
+        elapsed = time.perf_counter() - started
+        self.rows_written += len(rows)
+        self.rows_carried += carried
+        self.rows_dropped += dropped
+        self.seconds += elapsed
+        self.logger.debug("db_write_batch", extra={"rows": len(rows), "sites": len(sites), "carried": carried, "dropped": dropped,
+                                                   "rows_per_sec": round(len(rows) / elapsed) if elapsed else None})
+        return len(rows)
+
+    def close(self) -> None:
+        self.logger.info("db_write_done", extra={"rows": self.rows_written, "carried": self.rows_carried, "dropped": self.rows_dropped, "secs": round(self.seconds, 3), "rows_per_sec": round(self.rows_per_sec)})
+        self.engine.dispose()
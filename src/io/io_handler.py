@@ -1,5 +1,65 @@
 #io_handler aquatic q
 import os
+import csv
+import logging
+from typing import Iterable, List
+from urllib.parse import urlparse, urlunparse
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import BonusRecord
+from db_writer import BonusDBWriter
+
+# CSV columns follow BonusRecord, so each record is written as-is.
+CSV_FIELDS = list(BonusRecord._fields)
+
+def load_urls(path: str, logger: logging.Logger) -> List[str]:
+    """Reads the URL list, skipping blank lines and # comments."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    except OSError as e:
+        logger.error("url_list_load_fail", extra={"path": path, "err": str(e)})
+        return []
+
+def clean_url(url: str) -> str:
+    """Reduces a listed URL to its site root, e.g. https://example.com/RF123 -> https://example.com."""
+    try:
+        return urlunparse(urlparse(url.strip())._replace(path="", params="", query="", fragment=""))
+    except Exception:
+        return url.strip()
+
+def write_bonuses_to_csv(bonuses: Iterable[BonusRecord], csv_path: str, logger: logging.Logger) -> int:
+    """Appends bonuses to the CSV file, writing the header only when the file is new. Returns rows written."""
+    output_dir = os.path.dirname(csv_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    rows = 0
+    try:
+        with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(CSV_FIELDS)
+            for bonus in bonuses:
+                writer.writerow(bonus)
+                rows += 1
+    except OSError as e:
+        logger.error("csv_write_fail", extra={"path": csv_path, "err": str(e)})
+    return rows
+
+def write_bonuses_to_db(bonuses: List[BonusRecord], db_url: str, logger: logging.Logger) -> int:
+    """
+    Bulk-inserts one batch of bonuses and releases the engine. Returns rows written.
+    Runs write through ResultSink instead, which keeps one BonusDBWriter open for the whole run.
+    """
+    writer = BonusDBWriter(db_url, logger)
+    try:
+        return writer.write(bonuses)
+    except SQLAlchemyError as e:
+        logger.error("db_write_fail", extra={"rows": len(bonuses), "err": str(e)})
+        return 0
+    finally:
+        writer.close()
 
 def concatenate_files(root_directory, output_filepath):
     """Concatenates all files in a directory and its subdirectories into one file."""
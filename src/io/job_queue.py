@@ -0,0 +1,160 @@
+# job_queue.py
+
+import configparser
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import json_codec
+from io_handler import clean_url
+
+class JobQueue:
+    """
+    A shared work list for scraper nodes, one row per cleaned URL in a SQLite file.
+    Nodes lease batches inside an immediate transaction, so two nodes never hold the same URL;
+    a lease that is not renewed before it expires goes back to the pool, and a completion is only
+    accepted from the node that still holds the lease.
+
+    Only processes on the machine that holds the file may open it. WAL keeps its index in shared
+    memory, which processes on other hosts cannot see, and SQLite's documentation warns against using
+    a database over a network file system in any journal mode, since the locking those file systems
+    provide is often broken and concurrent writers can corrupt the file. Nodes on other hosts reach
+    the queue through queue_coordinator.JobQueueServer instead.
+
+    Methods block for up to the 30 second busy timeout while another node holds the write lock, so
+    async callers should run them in an executor; one connection is shared between threads under a lock.
+    """
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 3, journal_mode: str = "WAL"):
+        self.path = path
+        self.lease_seconds = max(1.0, lease_seconds)
+        self.max_attempts = max(1, max_attempts)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; every write below opens its own explicit transaction.
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                url TEXT PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                updated_at REAL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_expires ON jobs (status, lease_expires)")
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> "JobQueue":
+        return cls(
+            config.get('queue', 'path', fallback='data/jobs.db'),
+            lease_seconds=config.getfloat('queue', 'lease_seconds', fallback=300.0),
+            max_attempts=config.getint('queue', 'max_attempts', fallback=3),
+            journal_mode=config.get('queue', 'journal_mode', fallback='WAL'),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statements) -> Any:
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent leases serialize instead of deadlocking.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, urls: Iterable[str], run_id: str) -> int:
+        """
+        Adds each cleaned URL for `run_id`. URLs left over from an earlier run are reset to pending;
+        enqueueing the same run again leaves finished jobs alone. Returns the number of jobs (re)queued.
+        """
+        now = time.time()
+        rows = [(url, run_id, now) for url in dict.fromkeys(clean_url(url) for url in urls)]
+
+        def insert(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT INTO jobs (url, run_id, status, updated_at) VALUES (?, ?, 'pending', ?)
+                ON CONFLICT(url) DO UPDATE SET run_id = excluded.run_id, status = 'pending', lease_owner = NULL,
+                    lease_expires = NULL, attempts = 0, result = NULL, updated_at = excluded.updated_at
+                WHERE jobs.run_id != excluded.run_id""", rows)
+            return conn.total_changes - before
+        return self._write(insert)
+
+    def requeue_expired(self) -> int:
+        """Returns expired leases to the pool, or fails them once they have used up their attempts."""
+        return self._write(lambda conn: self._requeue(conn, time.time()))
+
+    def _requeue(self, conn: sqlite3.Connection, now: float) -> int:
+        cursor = conn.execute("""
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                lease_owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires < ?""", (self.max_attempts, now, now))
+        return cursor.rowcount
+
+    def lease(self, owner: str, batch_size: int) -> List[str]:
+        """Atomically takes up to `batch_size` pending URLs for `owner`, reclaiming expired leases first."""
+        now = time.time()
+
+        def take(conn: sqlite3.Connection) -> List[str]:
+            self._requeue(conn, now)
+            urls = [row[0] for row in conn.execute(
+                "SELECT url FROM jobs WHERE status = 'pending' ORDER BY updated_at, url LIMIT ?", (max(1, batch_size),))]
+            conn.executemany("""
+                UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                WHERE url = ?""", [(owner, now + self.lease_seconds, now, url) for url in urls])
+            return urls
+        return self._write(take)
+
+    def renew(self, owner: str, urls: Iterable[str]) -> int:
+        """Extends `owner`'s leases on `urls`; returns how many it still held."""
+        now = time.time()
+        rows = [(now + self.lease_seconds, now, owner, clean_url(url)) for url in urls]
+
+        def extend(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            conn.executemany("""
+                UPDATE jobs SET lease_expires = ?, updated_at = ?
+                WHERE lease_owner = ? AND url = ? AND status = 'leased'""", rows)
+            return conn.total_changes - before
+        return self._write(extend)
+
+    def complete(self, owner: str, url: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Marks `url` done with its result summary. False when `owner` no longer held the lease."""
+        now = time.time()
+
+        def finish(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute("""
+                UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE url = ? AND lease_owner = ? AND status = 'leased'""",
+                (json_codec.dumps(result) if result is not None else None, now, clean_url(url), owner))
+            return cursor.rowcount == 1
+        return self._write(finish)
+
+    def counts(self, active_only: bool = False) -> Dict[str, int]:
+        """
+        Jobs per status, e.g. {"pending": 120, "leased": 40, "done": 840}. With `active_only`, only
+        the jobs of runs that still have pending or leased work, leaving out finished earlier runs.
+        """
+        sql = "SELECT status, COUNT(*) FROM jobs"
+        if active_only:
+            sql += " WHERE run_id IN (SELECT DISTINCT run_id FROM jobs WHERE status IN ('pending', 'leased'))"
+        with self._lock:
+            return {status: count for status, count in self._conn.execute(sql + " GROUP BY status")}
+
+    def unfinished(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
@@ -0,0 +1,190 @@
+# metrics_store.py
+
+import asyncio
+import configparser
+import datetime
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import json_codec
+
+class MetricsStore:
+    """
+    Per-site run statistics kept as an append-only JSON Lines log next to a compacted snapshot.
+    Every site result is one appended line, so recording never rewrites history. Compaction folds
+    the log into per-site aggregates (runs, successes, bonus totals and the latest result), writes
+    the snapshot atomically and drops the folded log. Lines carry a sequence number, and any line
+    already folded into the snapshot is ignored on load, so a crash mid-compaction never double counts.
+    """
+    def __init__(self, path: str, logger: logging.Logger, compact_bytes: int = 1048576, enabled: bool = True):
+        self.path = path
+        self.log_path = path + ".log"
+        self.compacting_path = path + ".log.compacting"
+        self.logger = logger
+        self.compact_bytes = max(0, compact_bytes)
+        self.enabled = enabled
+        self._sites: Dict[str, Dict[str, Any]] = {}
+        self._previous: Dict[str, Dict[str, Any]] = {}
+        self._seq = 0
+        self._log = None
+        self._log_bytes = 0
+        self._compaction: Optional[asyncio.Future] = None
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, logger: logging.Logger) -> "MetricsStore":
+        return cls(
+            config.get('cache', 'metrics_path', fallback='cache/run_metrics_cache.json'),
+            logger,
+            compact_bytes=config.getint('cache', 'metrics_compact_bytes', fallback=1048576),
+            enabled=config.getboolean('cache', 'use_cache', fallback=False),
+        )
+
+    def load(self) -> "MetricsStore":
+        """Reads the snapshot, replays any log lines written after it, and remembers that state as the last run."""
+        if not self.enabled:
+            return self
+        snapshot_seq = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    data = json_codec.loads(f.read())
+                if isinstance(data, dict):
+                    self._sites = {k: v for k, v in data.get("sites", {}).items() if isinstance(v, dict)}
+                    snapshot_seq = int(data.get("seq", 0))
+            except (OSError, ValueError) as e:
+                self.logger.warning("metrics_load_fail", extra={"path": self.path, "err": str(e)})
+        self._seq = snapshot_seq
+        for path in (self.compacting_path, self.log_path):
+            self._replay(path, snapshot_seq)
+        self._previous = {url: site.get("latest", {}) for url, site in self._sites.items()}
+        if os.path.exists(self.compacting_path):
+            # The last compaction was interrupted; finish it before the log is rotated again.
+            self._write_snapshot(self._snapshot())
+        return self
+
+    def _replay(self, path: str, after_seq: int) -> None:
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json_codec.loads(line)
+                    except ValueError:
+                        # A crash can leave the last line half written; everything before it is intact.
+                        continue
+                    seq = entry.get("seq", 0) if isinstance(entry, dict) else 0
+                    if seq > after_seq:
+                        self._fold(entry)
+                        self._seq = max(self._seq, seq)
+        except OSError as e:
+            self.logger.warning("metrics_load_fail", extra={"path": path, "err": str(e)})
+
+    def _fold(self, entry: Dict[str, Any]) -> None:
+        site = self._sites.get(entry["url"])
+        if site is None:
+            site = self._sites[entry["url"]] = {"runs": 0, "successes": 0, "unchanged": 0, "bonus_total": 0,
+                                                "secs_total": 0.0, "first_seen": entry["date"]}
+        site["runs"] += 1
+        site["successes"] += 1 if entry.get("success") else 0
+        site["unchanged"] += 1 if entry.get("unchanged") else 0
+        site["bonus_total"] += entry.get("bonus_count", 0)
+        site["secs_total"] = round(site["secs_total"] + entry.get("secs", 0.0), 3)
+        site["latest"] = {k: v for k, v in entry.items() if k not in ("url", "seq")}
+
+    def previous(self, url: str) -> Optional[Dict[str, Any]]:
+        """The site's latest result as of startup, for comparing this run against the last one."""
+        return self._previous.get(url)
+
+    def summary(self, url: str) -> Optional[Dict[str, Any]]:
+        return self._sites.get(url)
+
+    def record(self, url: str, success: bool, bonus_count: int, unchanged: bool = False, secs: float = 0.0) -> None:
+        if not self.enabled:
+            return
+        self._seq += 1
+        entry = {"seq": self._seq, "url": url, "date": datetime.date.today().isoformat(), "success": success,
+                 "bonus_count": bonus_count, "unchanged": unchanged, "secs": round(secs, 3)}
+        self._fold(entry)
+        try:
+            if self._log is None:
+                os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+            line = json_codec.dumps(entry) + "\n"
+            self._log.write(line)
+            self._log.flush()
+            self._log_bytes += len(line)
+        except OSError as e:
+            self.logger.error("metrics_append_fail", extra={"path": self.log_path, "err": str(e)})
+            return
+        if self.compact_bytes and self._log_bytes >= self.compact_bytes and self._compaction is None:
+            self._start_compaction()
+
+    def _start_compaction(self) -> None:
+        # Runs on the event loop so appends and the rotation never interleave; the slow write happens off-loop.
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        try:
+            if os.path.exists(self.compacting_path):
+                self._append_to_compacting()
+            elif os.path.exists(self.log_path):
+                os.replace(self.log_path, self.compacting_path)
+        except OSError as e:
+            self.logger.error("metrics_compact_fail", extra={"path": self.log_path, "err": str(e)})
+            return
+        self._log_bytes = 0
+        self._compaction = asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, self._snapshot())
+        self._compaction.add_done_callback(lambda _: setattr(self, "_compaction", None))
+
+    def _append_to_compacting(self) -> None:
+        # A compaction that failed left lines its snapshot never stored; they stay, and the log joins them.
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'rb') as src, open(self.compacting_path, 'ab+') as dst:
+            dst.seek(0, os.SEEK_END)
+            if dst.tell():
+                dst.seek(-1, os.SEEK_END)
+                if dst.read(1) != b"\n":
+                    dst.write(b"\n")
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(self.log_path)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        # Copies each site so later folds on the loop do not race the writer thread.
+        return {"seq": self._seq, "sites": {url: dict(site) for url, site in self._sites.items()}}
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json_codec.dumps(snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # Only once the snapshot is in place are the lines it folded safe to drop.
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+            self.logger.info("metrics_compacted", extra={"path": self.path, "sites": len(snapshot["sites"]), "seq": snapshot["seq"]})
+        except OSError as e:
+            self.logger.error("metrics_compact_fail", extra={"path": self.path, "err": str(e)})
+
+    async def close(self) -> None:
+        """Waits for a running compaction, then compacts whatever the log still holds."""
+        if not self.enabled:
+            return
+        if self._compaction is not None:
+            await self._compaction
+        if self._log_bytes or os.path.exists(self.log_path):
+            self._start_compaction()
+            if self._compaction is not None:
+                await self._compaction
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,146 @@
+# queue_coordinator.py
+
+import asyncio
+import configparser
+import hmac
+import logging
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from aiohttp import web
+
+import json_codec
+from job_queue import JobQueue
+
+class JobQueueServer:
+    """
+    Serves one JobQueue over HTTP, so scraper nodes on other hosts can share it. The SQLite file
+    stays local to this process, which is the only one that opens it. Each call is a POST to
+    /queue/<method> with a JSON body and runs in an executor, and a background sweep returns
+    expired leases to the pool (or fails them) even while no node is leasing. When a token is
+    configured every request must carry it as a bearer token.
+    """
+    METHODS = ("info", "enqueue", "lease", "renew", "complete", "counts", "unfinished")
+
+    def __init__(self, jobs: JobQueue, logger: logging.Logger, token: str = ""):
+        self.jobs = jobs
+        self.logger = logger
+        self.token = token
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, logger: logging.Logger) -> "JobQueueServer":
+        return cls(JobQueue.from_config(config), logger, token=config.get('queue', 'token', fallback=''))
+
+    def _call(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "info":
+            return {"lease_seconds": self.jobs.lease_seconds}
+        if method == "enqueue":
+            return self.jobs.enqueue(params["urls"], params["run_id"])
+        if method == "lease":
+            return self.jobs.lease(params["owner"], int(params["batch_size"]))
+        if method == "renew":
+            return self.jobs.renew(params["owner"], params["urls"])
+        if method == "complete":
+            return self.jobs.complete(params["owner"], params["url"], params.get("result"))
+        if method == "counts":
+            return self.jobs.counts(bool(params.get("active_only")))
+        return self.jobs.unfinished()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if self.token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {self.token}"):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        method = request.match_info["method"]
+        if method not in self.METHODS:
+            return web.json_response({"error": f"unknown method {method}"}, status=404)
+        try:
+            params = json_codec.loads(await request.read() or b"{}")
+        except json_codec.JSONDecodeError:
+            return web.json_response({"error": "invalid JSON"}, status=400)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, self._call, method, params)
+        except (KeyError, TypeError, ValueError) as e:
+            return web.json_response({"error": f"bad parameters: {e}"}, status=400)
+        return web.json_response({"result": result}, dumps=json_codec.dumps)
+
+    async def _sweep(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.jobs.lease_seconds / 3)
+            requeued = await loop.run_in_executor(None, self.jobs.requeue_expired)
+            if requeued:
+                self.logger.info("job_queue_requeued", extra={"jobs": requeued})
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serves until cancelled."""
+        app = web.Application()
+        app.router.add_post("/queue/{method}", self._handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        self.logger.info("job_queue_serving", extra={"host": host, "port": port, "path": self.jobs.path})
+        sweeper = asyncio.create_task(self._sweep())
+        try:
+            await asyncio.Event().wait()
+        finally:
+            sweeper.cancel()
+            await runner.cleanup()
+            self.jobs.close()
+
+class RemoteJobQueue:
+    """
+    Client for a JobQueueServer with the same blocking methods as JobQueue, so a node uses either
+    one the same way. Raises OSError when the coordinator cannot be reached or rejects a call.
+    """
+    def __init__(self, url: str, token: str = "", timeout: float = 60.0):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self.lease_seconds = float(self._call("info")["lease_seconds"])
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> "RemoteJobQueue":
+        return cls(
+            config.get('queue', 'url'),
+            token=config.get('queue', 'token', fallback=''),
+            timeout=config.getfloat('queue', 'timeout', fallback=60.0),
+        )
+
+    def _call(self, method: str, **params: Any) -> Any:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(f"{self.url}/queue/{method}", data=json_codec.dumps(params).encode('utf-8'),
+                                         headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json_codec.loads(response.read())["result"]
+        except urllib.error.HTTPError as e:
+            raise OSError(f"job queue {method} failed: HTTP {e.code} {e.read().decode('utf-8', 'replace')}") from e
+
+    def close(self) -> None:
+        pass
+
+    def enqueue(self, urls: Iterable[str], run_id: str) -> int:
+        return self._call("enqueue", urls=list(urls), run_id=run_id)
+
+    def lease(self, owner: str, batch_size: int) -> List[str]:
+        return self._call("lease", owner=owner, batch_size=batch_size)
+
+    def renew(self, owner: str, urls: Iterable[str]) -> int:
+        return self._call("renew", owner=owner, urls=list(urls))
+
+    def complete(self, owner: str, url: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        return self._call("complete", owner=owner, url=url, result=result)
+
+    def counts(self, active_only: bool = False) -> Dict[str, int]:
+        return self._call("counts", active_only=active_only)
+
+    def unfinished(self) -> int:
+        return self._call("unfinished")
+
+def open_job_queue(config: configparser.ConfigParser) -> Union[JobQueue, RemoteJobQueue]:
+    """The coordinator at [queue] url when one is set, otherwise the local queue file at [queue] path."""
+    if config.get('queue', 'url', fallback='').strip():
+        return RemoteJobQueue.from_config(config)
+    return JobQueue.from_config(config)
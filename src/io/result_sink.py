@@ -0,0 +1,168 @@
+# result_sink.py
+
+import asyncio
+import configparser
+import datetime
+import logging
+import time
+from typing import Any, Callable, List, Optional
+
+import io_handler
+from db_writer import BonusDBWriter
+from models import SiteOutcome
+
+_CLOSE = object()
+
+class _Ack:
+    """Calls `on_written` once every output has flushed the rows it was queued with."""
+    def __init__(self, outputs: int, on_written: Callable[[], Any]):
+        self.remaining = outputs
+        self.failed = False
+        self.on_written = on_written
+
+    def done(self, ok: bool) -> None:
+        self.failed = self.failed or not ok
+        self.remaining -= 1
+        if self.remaining == 0 and not self.failed:
+            self.on_written()
+
+class _Output:
+    """
+    One destination (CSV, DB, ...) with its own bounded queue and drain task. An output that
+    takes sites is called as write(rows, sites) with the outcomes of the sites in the batch.
+    """
+    def __init__(self, name: str, write: Callable[..., Any], queue_size: int, close: Optional[Callable[[], Any]] = None,
+                 takes_sites: bool = False):
+        self.name = name
+        self.write = write
+        self.close = close
+        self.takes_sites = takes_sites
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.rows_written = 0
+
+class ResultSink:
+    """
+    Pipeline stage between process_url and the outputs. Each site's bonuses are fanned out
+    to one bounded queue per output; a drain task per output batches rows and flushes them
+    in a worker thread once `flush_rows` are buffered or `flush_interval` seconds have passed.
+    When a writer falls behind its queue fills up and `put` blocks, which slows the scrapers down
+    instead of letting memory grow. Outputs flush in queue order, so a `put` acknowledgement also
+    covers everything queued before it.
+    """
+    def __init__(self, logger: logging.Logger, queue_size: int = 64, flush_rows: int = 500, flush_interval: float = 5.0):
+        self.logger = logger
+        self.queue_size = max(1, queue_size)
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = flush_interval
+        self._outputs: List[_Output] = []
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, logger: logging.Logger, scrape_date: Optional[datetime.date] = None) -> "ResultSink":
+        sink = cls(
+            logger,
+            queue_size=config.getint('output', 'sink_queue_size', fallback=64),
+            flush_rows=config.getint('output', 'flush_rows', fallback=500),
+            flush_interval=config.getfloat('output', 'flush_interval', fallback=5.0),
+        )
+        if config.getboolean('output', 'enable_db_output'):
+            db_writer = BonusDBWriter(config.get('output', 'db_connection_string'), logger,
+                                      chunk_rows=config.getint('output', 'db_chunk_rows', fallback=1000), scrape_date=scrape_date)
+            sink.add_output("db", db_writer.write, close=db_writer.close, takes_sites=True)
+        if config.getboolean('output', 'enable_csv_output'):
+            csv_path = config.get('output', 'csv_output_path')
+            sink.add_output("csv", lambda batch: io_handler.write_bonuses_to_csv(batch, csv_path, logger))
+        return sink
+
+    def add_output(self, name: str, write: Callable[..., Any], close: Optional[Callable[[], Any]] = None, takes_sites: bool = False) -> None:
+        self._outputs.append(_Output(name, write, self.queue_size, close, takes_sites))
+
+    async def start(self) -> "ResultSink":
+        for output in self._outputs:
+            output.task = asyncio.create_task(self._drain(output))
+        return self
+
+    async def put(self, bonuses: List[Any], on_written: Optional[Callable[[], Any]] = None, site: Optional[SiteOutcome] = None) -> None:
+        """
+        Queues one site's bonuses for every output, waiting while any output is backed up.
+        `site` is written with them by the outputs that take sites. `on_written` is called once
+        every output has flushed them, and is never called if a flush raised or stored fewer rows
+        than it was given; with no bonuses it still waits for the rows queued earlier.
+        """
+        if on_written is None:
+            if not bonuses and site is None:
+                return
+            ack = None
+        elif not self._outputs:
+            on_written()
+            return
+        else:
+            ack = _Ack(len(self._outputs), on_written)
+        for output in self._outputs:
+            await output.queue.put((bonuses, ack, site))
+
+    async def close(self) -> None:
+        """Flushes everything still buffered and stops the drain tasks."""
+        for output in self._outputs:
+            if output.task:
+                await output.queue.put(_CLOSE)
+        await asyncio.gather(*(o.task for o in self._outputs if o.task))
+        for output in self._outputs:
+            if output.close:
+                output.close()
+
+    async def _flush(self, output: _Output, batch: List[Any], sites: List[SiteOutcome], acks: List[_Ack]) -> None:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        ok = True
+        try:
+            if batch or sites:
+                args = (batch, sites) if output.takes_sites else (batch,)
+                written = await loop.run_in_executor(None, output.write, *args)
+                # Writers log and swallow their own errors and return the rows they stored.
+                written = len(batch) if written is None else written
+                output.rows_written += written
+                if written < len(batch):
+                    # A short write must not acknowledge the batch, or the checkpoint would mark unwritten sites done.
+                    ok = False
+                    self.logger.error("sink_flush_short", extra={"output": output.name, "rows": len(batch), "written": written})
+                self.logger.debug("sink_flush", extra={"output": output.name, "rows": written, "sites": len(sites), "secs": round(time.perf_counter() - started, 3)})
+        except Exception as e:
+            ok = False
+            self.logger.error("sink_flush_fail", extra={"output": output.name, "rows": len(batch), "err": str(e)})
+        for ack in acks:
+            ack.done(ok)
+
+    async def _drain(self, output: _Output) -> None:
+        loop = asyncio.get_running_loop()
+        batch: List[Any] = []
+        sites: List[SiteOutcome] = []
+        acks: List[_Ack] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if batch or sites else None
+            try:
+                item = await asyncio.wait_for(output.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+            if item is _CLOSE:
+                if batch or sites or acks:
+                    await self._flush(output, batch, sites, acks)
+                return
+            if item:
+                rows, ack, site = item
+                site = site if output.takes_sites else None
+                if (rows or site) and not (batch or sites):
+                    deadline = loop.time() + self.flush_interval
+                batch.extend(rows)
+                if site:
+                    sites.append(site)
+                if ack:
+                    acks.append(ack)
+            if (batch or sites) and (len(batch) >= self.flush_rows or loop.time() >= deadline):
+                await self._flush(output, batch, sites, acks)
+                batch, sites, acks = [], [], []
+            elif acks and not batch:
+                # No rows buffered: everything queued before these acknowledgements is written with them.
+                await self._flush(output, batch, sites, acks)
+                sites, acks = [], []
@@ -0,0 +1,102 @@
+# run_cache.py
+
+import configparser
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional, Set
+
+import json_codec
+
+class RunCache:
+    """
+    A JSON document persisted between runs, split into named sections
+    (e.g. "auth"), each mapping a key such as a cleaned URL to a JSON value.
+    """
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._touched: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> "RunCache":
+        return cls(
+            config.get('cache', 'run_cache_path', fallback='cache/run_cache.json'),
+            config.getboolean('cache', 'use_cache', fallback=False),
+        )
+
+    def load(self, logger: logging.Logger) -> "RunCache":
+        if not self.enabled or not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, 'rb') as f:
+                data = json_codec.loads(f.read())
+            if isinstance(data, dict):
+                self._data = {k: v for k, v in data.items() if isinstance(v, dict)}
+        except (OSError, ValueError) as e:
+            logger.warning("run_cache_load_fail", extra={"path": self.path, "err": str(e)})
+        return self
+
+    def section(self, name: str) -> Dict[str, Any]:
+        return self._data.setdefault(name, {})
+
+    def get(self, section: str, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return self._data.get(section, {}).get(key)
+
+    def set(self, section: str, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self.section(section)[key] = value
+        self._dirty = True
+        self._touched.setdefault(section, set()).add(key)
+
+    def delete(self, section: str, key: str) -> None:
+        if self._data.get(section, {}).pop(key, None) is not None:
+            self._dirty = True
+            self._touched.setdefault(section, set()).add(key)
+
+    def changes(self, clear: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Entries set or deleted since loading, as {"set": {section: {key: value}}, "delete": {section: [keys]}},
+        so a worker process can hand its updates to the process that owns the file. With `clear`,
+        the next call reports only what changed after this one.
+        """
+        changed: Dict[str, Dict[str, Any]] = {"set": {}, "delete": {}}
+        for section, keys in self._touched.items():
+            values = self._data.get(section, {})
+            for key in keys:
+                if key in values:
+                    changed["set"].setdefault(section, {})[key] = values[key]
+                else:
+                    changed["delete"].setdefault(section, []).append(key)
+        if clear:
+            self._touched = {}
+        return changed
+
+    def merge(self, changes: Dict[str, Dict[str, Any]]) -> None:
+        """Applies the output of another instance's changes()."""
+        for section, entries in changes.get("set", {}).items():
+            for key, value in entries.items():
+                self.set(section, key, value)
+        for section, keys in changes.get("delete", {}).items():
+            for key in keys:
+                self.delete(section, key)
+
+    def save(self, logger: logging.Logger) -> None:
+        """Writes the cache atomically (temp file + rename) so a crash never leaves a truncated file."""
+        if not self.enabled or not self._dirty:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.run_cache.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json_codec.dumps(self._data))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.error("run_cache_save_fail", extra={"path": self.path, "err": str(e)})
@@ -2,9 +2,10 @@
 
 import logging
 import os
-import json
 from logging.handlers import RotatingFileHandler
 
+import json_codec
+
 class DetailFormatter(logging.Formatter):
     """A custom formatter to include extra data in text logs."""
     def format(self, record):
@@ -15,8 +16,8 @@ class DetailFormatter(logging.Formatter):
         extra_items = {k: v for k, v in record.__dict__.items() if k not in logging.LogRecord.__dict__}
         if extra_items:
             try:
-                # Use json.dumps for a consistent, readable format
-                details_str = json.dumps(extra_items)
+                # Use the shared JSON codec for a consistent, readable format
+                details_str = json_codec.dumps(extra_items)
                 log_string += f" -- Details: {details_str}"
             except TypeError:
                 pass # Ignore errors if extra data isn't serializable
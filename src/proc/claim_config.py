@@ -0,0 +1,170 @@
+# claim_config.py
+
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+import json_codec
+
+class ClaimFlags(NamedTuple):
+    """Attributes derived from a bonus's claimConfig, in BonusRecord field order."""
+    is_auto_claim: bool = False
+    is_vip_only: bool = False
+    has_loss_requirement: bool = False
+    has_topup_requirement: bool = False
+    loss_req_percent: Optional[float] = None
+    loss_req_amount: Optional[float] = None
+    topup_req_amount: Optional[float] = None
+    claim_type: Optional[str] = None
+
+NO_CLAIM_FLAGS = ClaimFlags()
+
+# A rule receives the flags being built and the original (non upper-cased) config item.
+RuleAction = Callable[[Dict[str, Any], str], None]
+
+def _set(field: str, value: Any) -> RuleAction:
+    def action(flags: Dict[str, Any], item: str) -> None:
+        flags[field] = value
+    return action
+
+# processing imports this module, so its parser is looked up when a rule first runs.
+def _loss(flags: Dict[str, Any], item: str) -> None:
+    from processing import _parse_float
+    flags["has_loss_requirement"] = True
+    parts = item.split('_')
+    if len(parts) > 1:
+        val_str = parts[-1].replace('%', '')
+        if '%' in parts[-1]: flags["loss_req_percent"] = _parse_float(val_str)
+        else: flags["loss_req_amount"] = _parse_float(val_str)
+
+def _topup(flags: Dict[str, Any], item: str) -> None:
+    from processing import _parse_float
+    flags["has_topup_requirement"] = True
+    parts = item.split('_')
+    if len(parts) > 1: flags["topup_req_amount"] = _parse_float(parts[-1])
+
+# Applied in this order when an item contains several tokens, so later claim types win.
+DEFAULT_RULES: List[Tuple[str, RuleAction]] = [
+    ("AUTO_CLAIM", _set("is_auto_claim", True)),
+    ("VIP", _set("is_vip_only", True)),
+    ("DEPOSIT", _set("claim_type", "DEPOSIT")),
+    ("RESCUE", _set("claim_type", "RESCUE")),
+    ("REBATE", _set("claim_type", "REBATE")),
+    ("LOSS", _loss),
+    ("TOPUP", _topup),
+]
+
+class _TokenAutomaton:
+    """
+    Aho-Corasick matcher over a fixed set of tokens. `find` walks the text once, character by
+    character, and reports every token that occurs in it, including tokens that overlap or are
+    a prefix or suffix of another (AUTO inside AUTO_CLAIM), however many tokens there are.
+    """
+    def __init__(self, tokens: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        ends: List[Set[str]] = [set()]
+        for token in tokens:
+            state = 0
+            for ch in token:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = self._goto[state][ch] = len(self._goto)
+                    self._goto.append({})
+                    ends.append(set())
+                state = nxt
+            ends[state].add(token)
+        # Breadth-first, so a state's failure link is final before its children are linked.
+        self._fail = [0] * len(self._goto)
+        self._output: List[FrozenSet[str]] = [frozenset()] * len(self._goto)
+        pending = deque(self._goto[0].values())
+        for state in pending:
+            self._output[state] = frozenset(ends[state])
+        while pending:
+            state = pending.popleft()
+            for ch, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] = frozenset(ends[child]) | self._output[self._fail[child]]
+                pending.append(child)
+
+    def find(self, text: str) -> Set[str]:
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+class ClaimConfigClassifier:
+    """
+    Turns raw claimConfig strings into ClaimFlags. Every token of the rule table is found
+    in one pass over each item by an Aho-Corasick automaton, and results are kept in a bounded LRU cache keyed
+    by the raw string, since a handful of distinct configs repeat across thousands of bonuses.
+    """
+    def __init__(self, rules: Optional[List[Tuple[str, RuleAction]]] = None, max_size: int = 4096):
+        self.max_size = max(1, max_size)
+        self._rules: List[Tuple[str, RuleAction]] = []
+        self._cache: "OrderedDict[str, ClaimFlags]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        for token, action in (rules if rules is not None else DEFAULT_RULES):
+            self._rules.append((token.upper(), action))
+        self._compile()
+
+    def _compile(self) -> None:
+        tokens = list(dict.fromkeys(token for token, _ in self._rules if token))
+        self._matcher = _TokenAutomaton(tokens) if tokens else None
+        self._cache.clear()
+
+    def register_rule(self, token: str, action: RuleAction) -> None:
+        """
+        Adds a token to the rule table; cached results are dropped since they may now differ.
+        A token registered again keeps its earlier actions, and all of them run in registration order.
+        """
+        self._rules.append((token.upper(), action))
+        self._compile()
+
+    def classify(self, raw_config: Any, bonus_id: str, logger: logging.Logger) -> ClaimFlags:
+        if not isinstance(raw_config, str) or not raw_config.startswith('['):
+            return NO_CLAIM_FLAGS
+        cached = self._cache.get(raw_config)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(raw_config)
+            return cached
+        self.misses += 1
+        result = self._classify(raw_config, bonus_id, logger)
+        self._cache[raw_config] = result
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _classify(self, raw_config: str, bonus_id: str, logger: logging.Logger) -> ClaimFlags:
+        try:
+            config_list = json_codec.loads(raw_config)
+        except json_codec.JSONDecodeError:
+            logger.debug("claim_config_parse_fail", {"config": raw_config, "bonus_id": bonus_id})
+            return NO_CLAIM_FLAGS
+        if not isinstance(config_list, list) or self._matcher is None:
+            return NO_CLAIM_FLAGS
+        flags: Dict[str, Any] = {}
+        for item in config_list:
+            if not isinstance(item, str): continue
+            found = self._matcher.find(item.upper())
+            for token, action in self._rules:
+                if token in found:
+                    action(flags, item)
+        return ClaimFlags(**flags) if flags else NO_CLAIM_FLAGS
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache),
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
+
+default_classifier = ClaimConfigClassifier()
@@ -0,0 +1,42 @@
+# fingerprint.py
+
+import datetime
+import hashlib
+from typing import Any, List, Optional
+
+import json_codec
+from run_cache import RunCache
+
+def payload_fingerprint(bonuses_json: List[Any]) -> str:
+    """
+    Stable hash of a site's bonus+promotion list. Keys are sorted and items are hashed
+    in sorted order, so reordering by the API does not count as a change.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for encoded in sorted(json_codec.dumps(item, sort_keys=True) for item in bonuses_json):
+        digest.update(encoded.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+class FingerprintStore:
+    """Remembers the last payload fingerprint per cleaned URL so unchanged sites can be skipped."""
+    SECTION = "fingerprints"
+
+    def __init__(self, run_cache: RunCache):
+        self.run_cache = run_cache
+
+    def last(self, url: str) -> Optional[str]:
+        entry = self.run_cache.get(self.SECTION, url)
+        return entry.get("hash") if isinstance(entry, dict) else None
+
+    def last_count(self, url: str) -> int:
+        entry = self.run_cache.get(self.SECTION, url)
+        return entry.get("bonus_count", 0) if isinstance(entry, dict) else 0
+
+    def is_unchanged(self, url: str, fingerprint: str) -> bool:
+        return self.last(url) == fingerprint
+
+    def remember(self, url: str, fingerprint: str, bonus_count: int) -> None:
+        self.run_cache.set(self.SECTION, url, {
+            "hash": fingerprint, "bonus_count": bonus_count, "date": datetime.date.today().isoformat(),
+        })
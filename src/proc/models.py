@@ -1,6 +1,7 @@
 # models.py
 import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime
+from typing import NamedTuple, Optional
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, Index
 from sqlalchemy.orm import declarative_base
 from pydantic import BaseModel
 
@@ -13,6 +14,50 @@ class AuthData(BaseModel):
     token: str
     api_url: str
 
+# Define BonusRecord as the compact, tuple-backed result of processing.
+class BonusRecord(NamedTuple):
+    """One processed bonus. Field order matches the bonuses table; the DB writer turns it into a row."""
+    url: str
+    merchant_name: str
+    id: str
+    name: str
+    amount: float
+    rollover: float
+    bonus_fixed: float
+    min_withdraw: float
+    max_withdraw: float
+    withdraw_to_bonus_ratio: Optional[float]
+    min_topup: float
+    max_topup: float
+    transaction_type: str
+    balance: str
+    bonus: str
+    bonus_random: str
+    reset: str
+    refer_link: str
+    is_auto_claim: bool = False
+    is_vip_only: bool = False
+    has_loss_requirement: bool = False
+    has_topup_requirement: bool = False
+    loss_req_percent: Optional[float] = None
+    loss_req_amount: Optional[float] = None
+    topup_req_amount: Optional[float] = None
+    claim_type: Optional[str] = None
+    raw_claim_config: str = ""
+    raw_claim_condition: str = ""
+
+# What a run learned about one site. Unchanged sites keep the rows of their last snapshot and
+# failed sites have no data for the day, which is different from a site that lists no bonuses.
+SITE_SCRAPED = "scraped"
+SITE_UNCHANGED = "unchanged"
+SITE_FAILED = "failed"
+
+class SiteOutcome(NamedTuple):
+    """One site's result for a run, stored in site_runs together with the rows written for it."""
+    url: str
+    status: str
+    bonus_count: int = 0
+
 # Define the SQLAlchemy base for database tables.
 Base = declarative_base()
 
@@ -20,6 +65,12 @@ Base = declarative_base()
 class Bonus(Base):
     """SQLAlchemy model representing the 'bonuses' table."""
     __tablename__ = 'bonuses'
+    # Natural key used by the upsert writer: one row per bonus, per site, per scrape day.
+    # (url, scrape_date) reads a site's rows for one day, for the comparison report and the carry-forward.
+    __table_args__ = (
+        Index('ux_bonuses_url_id_date', 'url', 'id', 'scrape_date', unique=True),
+        Index('ix_bonuses_url_date', 'url', 'scrape_date'),
+    )
     db_id = Column(Integer, primary_key=True, autoincrement=True)
     url = Column(String)
     merchant_name = Column(String)
@@ -49,4 +100,22 @@ class Bonus(Base):
     claim_type = Column(String, nullable=True)
     raw_claim_config = Column(String)
     raw_claim_condition = Column(String)
+    scrape_date = Column(Date, default=datetime.date.today)
+    content_hash = Column(String(32))
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# Define SiteRun as a SQLAlchemy model for each site's outcome per scrape day.
+class SiteRun(Base):
+    """SQLAlchemy model representing the 'site_runs' table."""
+    __tablename__ = 'site_runs'
+    # The comparison report and the archive read the sites covered on a day through (scrape_date, status).
+    __table_args__ = (
+        Index('ux_site_runs_url_date', 'url', 'scrape_date', unique=True),
+        Index('ix_site_runs_date_status', 'scrape_date', 'status'),
+    )
+    db_id = Column(Integer, primary_key=True, autoincrement=True)
+    url = Column(String)
+    scrape_date = Column(Date)
+    status = Column(String)
+    bonus_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
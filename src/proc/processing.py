@@ -1,10 +1,11 @@
 # processing.py
 
-import json
 import logging
+import sys
 from typing import Any, List, Dict
 
-from models import Bonus # <--- Corrected Import
+from models import BonusRecord
+from claim_config import ClaimFlags, default_classifier
 
 def _parse_float(value: Any) -> float:
     # ... function content is unchanged
@@ -12,66 +13,46 @@ def _parse_float(value: Any) -> float:
     try: return float(value)
     except (ValueError, TypeError): return 0.0
 
-def _create_and_map_bonus(data: Dict[str, Any], url: str, merchant_name: str) -> Bonus:
-    bonus_obj = Bonus() # <--- Corrected Class
-    bonus_obj.url = url
-    bonus_obj.merchant_name = merchant_name
-    bonus_obj.id = str(data.get("id", ""))
-    bonus_obj.name = str(data.get("name", ""))
-    bonus_obj.amount = _parse_float(data.get("amount"))
-    bonus_obj.rollover = _parse_float(data.get("rollover"))
-    bonus_obj.bonus_fixed = _parse_float(data.get("bonusFixed"))
-    bonus_obj.min_withdraw = _parse_float(data.get("minWithdraw"))
-    bonus_obj.max_withdraw = _parse_float(data.get("maxWithdraw"))
-    bonus_obj.min_topup = _parse_float(data.get("minTopup"))
-    bonus_obj.max_topup = _parse_float(data.get("maxTopup"))
-    bonus_obj.withdraw_to_bonus_ratio = bonus_obj.min_withdraw / bonus_obj.bonus_fixed if bonus_obj.bonus_fixed != 0 else None
-    bonus_obj.transaction_type = str(data.get("transactionType", ""))
-    bonus_obj.balance = str(data.get("balance", ""))
-    bonus_obj.bonus = str(data.get("bonus", ""))
-    bonus_obj.bonus_random = str(data.get("bonusRandom", ""))
-    bonus_obj.reset = str(data.get("reset", ""))
-    bonus_obj.refer_link = str(data.get("referLink", ""))
-    bonus_obj.raw_claim_config = data.get("claimConfig", "")
-    bonus_obj.raw_claim_condition = data.get("claimCondition", "")
-    return bonus_obj
+def _create_and_map_bonus(data: Dict[str, Any], url: str, merchant_name: str, logger: logging.Logger) -> BonusRecord:
+    bonus_id = str(data.get("id", ""))
+    bonus_fixed = _parse_float(data.get("bonusFixed"))
+    min_withdraw = _parse_float(data.get("minWithdraw"))
+    raw_claim_config = data.get("claimConfig", "")
+    return BonusRecord(
+        url,
+        merchant_name,
+        bonus_id,
+        str(data.get("name", "")),
+        _parse_float(data.get("amount")),
+        _parse_float(data.get("rollover")),
+        bonus_fixed,
+        min_withdraw,
+        _parse_float(data.get("maxWithdraw")),
+        min_withdraw / bonus_fixed if bonus_fixed != 0 else None,
+        _parse_float(data.get("minTopup")),
+        _parse_float(data.get("maxTopup")),
+        str(data.get("transactionType", "")),
+        str(data.get("balance", "")),
+        str(data.get("bonus", "")),
+        str(data.get("bonusRandom", "")),
+        str(data.get("reset", "")),
+        str(data.get("referLink", "")),
+        *_parse_claim_config(raw_claim_config, bonus_id, logger),
+        raw_claim_config,
+        data.get("claimCondition", ""),
+    )
 
-def _parse_claim_config(bonus_obj: Bonus, logger: logging.Logger) -> Bonus:
-    # ... function content is unchanged
-    raw_config = bonus_obj.raw_claim_config
-    if not isinstance(raw_config, str) or not raw_config.startswith('['): return bonus_obj
-    try:
-        config_list = json.loads(raw_config)
-        if not isinstance(config_list, list): return bonus_obj
-        for item in config_list:
-            if not isinstance(item, str): continue
-            item_upper = item.upper()
-            if "AUTO_CLAIM" in item_upper: bonus_obj.is_auto_claim = True
-            if "VIP" in item_upper: bonus_obj.is_vip_only = True
-            if "DEPOSIT" in item_upper: bonus_obj.claim_type = "DEPOSIT"
-            if "RESCUE" in item_upper: bonus_obj.claim_type = "RESCUE"
-            if "REBATE" in item_upper: bonus_obj.claim_type = "REBATE"
-            if "LOSS" in item_upper:
-                bonus_obj.has_loss_requirement = True
-                parts = item.split('_')
-                if len(parts) > 1:
-                    val_str = parts[-1].replace('%', '')
-                    if '%' in parts[-1]: bonus_obj.loss_req_percent = _parse_float(val_str)
-                    else: bonus_obj.loss_req_amount = _parse_float(val_str)
-            if "TOPUP" in item_upper:
-                bonus_obj.has_topup_requirement = True
-                parts = item.split('_')
-                if len(parts) > 1: bonus_obj.topup_req_amount = _parse_float(parts[-1])
-    except json.JSONDecodeError:
-        logger.debug("claim_config_parse_fail", {"config": raw_config, "bonus_id": bonus_obj.id})
-    return bonus_obj
+def _parse_claim_config(raw_config: Any, bonus_id: str, logger: logging.Logger) -> ClaimFlags:
+    # Memoized per raw string; see claim_config.ClaimConfigClassifier.
+    return default_classifier.classify(raw_config, bonus_id, logger)
 
-def process_bonuses(bonuses_json: List[Dict[str, Any]], url: str, merchant_name: str, logger: logging.Logger) -> List[Bonus]:
+def process_bonuses(bonuses_json: List[Dict[str, Any]], url: str, merchant_name: str, logger: logging.Logger) -> List[BonusRecord]:
+    # Every record of a site shares one interned copy of these strings.
+    url = sys.intern(url)
+    merchant_name = sys.intern(merchant_name)
     processed_list = []
     for bonus_data in bonuses_json:
         if not isinstance(bonus_data, dict):
             continue
-        bonus_obj = _create_and_map_bonus(bonus_data, url, merchant_name)
-        fully_processed_bonus = _parse_claim_config(bonus_obj, logger)
-        processed_list.append(fully_processed_bonus)
+        processed_list.append(_create_and_map_bonus(bonus_data, url, merchant_name, logger))
     return processed_list
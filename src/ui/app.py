@@ -1,13 +1,14 @@
 # app.py
-from flask import Flask, request, jsonify, render_template_string, flash, redirect, url_for, send_file
+from flask import Flask, request, jsonify, render_template_string, flash, redirect, url_for, send_file, Response, stream_with_context
 from flask_login import LoginManager, UserMixin, login_required, login_user, logout_user, current_user
 import configparser
-import threading
-import asyncio
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+# The scraper modules import each other by bare name.
+for _pkg in ("core", "log", "io", "proc", "acq", "ui"):
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..', _pkg))
 try:
     import src.io.io_handler as io_handler
     import src.log.logger_config as logger_config
@@ -16,12 +17,15 @@ except ImportError:
     io_handler = None
     logger_config = None
 
-# Import main scraper function if available
+# Import the scraper job runner if available
 try:
-    from main import main as run_scraper
+    from web_runner import ScrapeRunner
+    from status_stream import StatusBroadcaster
+    from checkpoint import RunCheckpoint
 except ImportError:
-    def run_scraper():
-        pass  # Placeholder function
+    ScrapeRunner = None
+    StatusBroadcaster = None
+    RunCheckpoint = None
 
 
 app = Flask(__name__)
@@ -53,22 +57,41 @@ INDEX_HTML = """
         .results a { display: inline-block; margin: 5px; padding: 8px 15px; background: #28a745; color: white; text-decoration: none; border-radius: 4px; }
     </style>
     <script>
+        function showStatus(data) {
+            if (!data.message) return;
+            document.getElementById('status-message').textContent = data.message;
+            document.getElementById('progress-text').textContent = data.progress + ' / ' + data.total;
+            if (data.total > 0) {
+                const percent = (data.progress / data.total) * 100;
+                document.getElementById('progress-bar').style.width = percent + '%';
+            }
+        }
         function updateStatus() {
             fetch('/status')
                 .then(response => response.json())
                 .then(data => {
-                    document.getElementById('status-message').textContent = data.message;
-                    document.getElementById('progress-text').textContent = data.progress + ' / ' + data.total;
-                    if (data.total > 0) {
-                        const percent = (data.progress / data.total) * 100;
-                        document.getElementById('progress-bar').style.width = percent + '%';
-                    }
+                    showStatus(data);
                     if (data.message === 'Running') {
                         setTimeout(updateStatus, 2000);
                     }
                 });
         }
-        setInterval(updateStatus, 5000);
+        document.addEventListener('DOMContentLoaded', () => {
+            if (!window.EventSource) {
+                setInterval(updateStatus, 5000);
+                return;
+            }
+            // The server pushes each change; no polling needed.
+            const source = new EventSource('/status/stream');
+            source.addEventListener('status', e => showStatus(JSON.parse(e.data)));
+            source.addEventListener('sites', e => {
+                const sites = JSON.parse(e.data).sites;
+                const site = sites[sites.length - 1];
+                if (!site) return;
+                const outcome = site.unchanged ? 'unchanged' : (site.success ? site.bonus_count + ' bonuses' : 'failed');
+                document.getElementById('last-site').textContent = site.url + ' (' + outcome + ', ' + site.rate + ' req/s)';
+            });
+        });
     </script>
 </head>
 <body>
@@ -100,10 +123,23 @@ INDEX_HTML = """
         </form>
     </div>
     
+    <div class="form-group">
+        <h2>Resume an Interrupted Run</h2>
+        <form method="post" action="/resume_scraper">
+            <div class="form-group">
+                <label for="run_id">Run ID:</label>
+                <input type="text" name="run_id" id="run_id" list="run-ids" value="{{ runs[0] if runs else '' }}">
+                <datalist id="run-ids">{% for run in runs %}<option value="{{ run }}">{% endfor %}</datalist>
+            </div>
+            <button type="submit" class="btn">⏯️ Resume</button>
+        </form>
+    </div>
+    
     <div class="status">
         <h3>Status</h3>
         <p><strong>Current Status:</strong> <span id="status-message">{{ status.message }}</span></p>
         <p><strong>Progress:</strong> <span id="progress-text">{{ status.progress }} / {{ status.total }}</span></p>
+        <p><strong>Last Site:</strong> <span id="last-site">{{ status.last_url or '-' }}</span></p>
         <div class="progress">
             <div class="progress-bar" id="progress-bar" style="width: {% if status.total > 0 %}{{ (status.progress / status.total * 100)|round }}{% else %}0{% endif %}%"></div>
         </div>
@@ -120,6 +156,17 @@ INDEX_HTML = """
 """
 
 scraper_status = {"message": "Idle", "progress": 0, "total": 0, "data_file_path": ""}
+status_stream = StatusBroadcaster() if StatusBroadcaster else None
+if status_stream:
+    status_stream.publish(scraper_status)
+
+def publish_status(job, site=None):
+    """Runner callback: keeps scraper_status current for /status and pushes the change to /status/stream clients."""
+    scraper_status.update(job)
+    status_stream.publish(scraper_status, site)
+
+# Jobs run the real pipeline on one background event loop; each site's progress lands in scraper_status.
+runner = ScrapeRunner('In/config.ini', on_update=publish_status) if ScrapeRunner else None
 
 class User(UserMixin):
     def __init__(self, id):
@@ -201,7 +248,15 @@ def index():
             scraper_status["data_file_path"] = ""
     except:
         scraper_status["data_file_path"] = ""
-    return render_template_string(INDEX_HTML, status=scraper_status)
+    return render_template_string(INDEX_HTML, status=scraper_status, runs=checkpoint_runs())
+
+def checkpoint_runs():
+    """Run IDs that have a checkpoint, newest first."""
+    if RunCheckpoint is None:
+        return []
+    config = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+    config.read('In/config.ini')
+    return RunCheckpoint.list_runs(config.get('checkpoint', 'dir', fallback='cache/checkpoints'))
 
 @app.route('/logout')
 @login_required
@@ -210,6 +265,13 @@ def logout():
     logout_user()
     return redirect(url_for('login'))
 
+def start_job(**job) -> None:
+    """Hands a job to the background runner, or records why it cannot run."""
+    if runner is None:
+        scraper_status.update({"message": "Error: scraper modules are not available", "progress": 0, "total": 0})
+        return
+    runner.submit(**job)
+
 @app.route('/run_scraper', methods=['POST'])
 @login_required
 def run_scraper_route():
@@ -223,34 +285,12 @@ def run_scraper_route():
     try:
         urls = url_file.read().decode('utf-8').splitlines()
         urls = [url.strip() for url in urls if url.strip()]  # Clean up URLs
-        scraper_status.update({"message": "Running", "progress": 0, "total": len(urls)})
-        
-        def run():
-            try:
-                # Write URLs to a temporary file
-                url_file_path = os.path.join('In', 'temp_urls.txt')
-                with open(url_file_path, 'w') as f:
-                    for url in urls:
-                        f.write(url + '\n')
-                
-                # Update config to use the temporary file
-                config = configparser.ConfigParser()
-                config.read('In/config.ini')
-                config.set('scraper', 'url_list_path', url_file_path)
-                
-                # Run the scraper
-                asyncio.run(run_scraper())
-                scraper_status.update({"message": "Completed", "progress": len(urls)})
-            except Exception as e:
-                logger.error("scraper_run_fail", {"err": str(e)})
-                scraper_status.update({"message": f"Error: {str(e)}", "progress": 0})
-        
-        threading.Thread(target=run, daemon=True).start()
-        return redirect(url_for('index'))
+        start_job(urls=urls)
     except Exception as e:
-        logger.error("scraper_run_fail", {"err": str(e)})
+        if logger:
+            logger.error("scraper_run_fail", {"err": str(e)})
         scraper_status.update({"message": f"Error: {str(e)}", "progress": 0})
-        return redirect(url_for('index'))
+    return redirect(url_for('index'))
 
 @app.route('/run_scraper_manual', methods=['POST'])
 @login_required
@@ -261,37 +301,21 @@ def run_scraper_manual():
         scraper_status.update({"message": "No URLs provided", "progress": 0, "total": 0})
         return redirect(url_for('index'))
     
-    logger = logger_config.setup_logger()
-    try:
-        urls = [url.strip() for url in urls_text.splitlines() if url.strip()]
-        scraper_status.update({"message": "Running", "progress": 0, "total": len(urls)})
-        
-        def run():
-            try:
-                # Write URLs to a temporary file
-                url_file_path = os.path.join('In', 'temp_urls.txt')
-                with open(url_file_path, 'w') as f:
-                    for url in urls:
-                        f.write(url + '\n')
-                
-                # Update config to use the temporary file
-                config = configparser.ConfigParser()
-                config.read('In/config.ini')
-                config.set('scraper', 'url_list_path', url_file_path)
-                
-                # Run the scraper
-                asyncio.run(run_scraper())
-                scraper_status.update({"message": "Completed", "progress": len(urls)})
-            except Exception as e:
-                logger.error("scraper_run_fail", {"err": str(e)})
-                scraper_status.update({"message": f"Error: {str(e)}", "progress": 0})
-        
-        threading.Thread(target=run, daemon=True).start()
-        return redirect(url_for('index'))
-    except Exception as e:
-        logger.error("scraper_run_fail", {"err": str(e)})
-        scraper_status.update({"message": f"Error: {str(e)}", "progress": 0})
+    urls = [url.strip() for url in urls_text.splitlines() if url.strip()]
+    start_job(urls=urls)
+    return redirect(url_for('index'))
+
+@app.route('/resume_scraper', methods=['POST'])
+@login_required
+def resume_scraper():
+    """Continues an interrupted run, scraping only the sites its checkpoint does not mark done."""
+    run_id = request.form.get('run_id', '').strip()
+    if not run_id:
+        scraper_status.update({"message": "No run ID provided", "progress": 0, "total": 0})
         return redirect(url_for('index'))
+    
+    start_job(resume=run_id)
+    return redirect(url_for('index'))
 
 @app.route('/status')
 @login_required
@@ -299,6 +323,15 @@ def status():
     """Returns the current scraper status."""
     return jsonify(scraper_status)
 
+@app.route('/status/stream')
+@login_required
+def status_stream_route():
+    """Pushes status and per-site events as Server-Sent Events."""
+    if status_stream is None:
+        return jsonify({"error": "status stream unavailable"}), 503
+    return Response(stream_with_context(status_stream.stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/download/<format_type>')
 @login_required
 def download_results(format_type):
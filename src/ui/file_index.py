@@ -0,0 +1,127 @@
+# file_index.py
+
+import fnmatch
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+SORT_KEYS = {
+    "name": lambda f: f["name"],
+    "modified": lambda f: f["mtime"],
+    "size": lambda f: f["bytes"],
+    "type": lambda f: (f["type"], f["name"]),
+}
+
+# Listing of every missing directory. Being the same object each time keeps the index version stable.
+_NO_FILES: List[Dict[str, Any]] = []
+
+def format_file_size(size: int) -> str:
+    """Format file size in human readable format."""
+    if size < 1024:
+        return f"{size} bytes"
+    elif size < 1024 * 1024:
+        return f"{size/1024:.1f} KB"
+    elif size < 1024 * 1024 * 1024:
+        return f"{size/(1024*1024):.1f} MB"
+    else:
+        return f"{size/(1024*1024*1024):.1f} GB"
+
+class OutputFileIndex:
+    """
+    Cached listing of the output files shown on the dashboard. A directory is read again only when
+    its mtime changes, which happens whenever a file is created, removed or renamed in it, or once
+    its listing is `max_age_seconds` old, which picks up files that grew in place such as the active
+    log. Otherwise a request costs one stat per directory however many files they hold.
+    """
+    def __init__(self, directories: Sequence[str], patterns: Sequence[str], max_age_seconds: float = 60.0):
+        self.directories = list(directories)
+        self.patterns = list(patterns)
+        self.max_age_seconds = max(0.0, max_age_seconds)
+        self._lock = threading.Lock()
+        self._listings: Dict[str, Tuple[int, float, List[Dict[str, Any]]]] = {}
+        self._version: Optional[tuple] = None
+        self._sorted: Dict[Tuple[str, bool], List[Dict[str, Any]]] = {}
+
+    def _scan(self, directory: str) -> List[Dict[str, Any]]:
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not any(fnmatch.fnmatch(entry.name, pattern) for pattern in self.patterns):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Removed between listing and stat.
+                files.append({
+                    'name': entry.name,
+                    'size': format_file_size(stat.st_size),
+                    'path': entry.name if directory == '.' else f"{directory}/{entry.name}",
+                    'bytes': stat.st_size,
+                    'modified': datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+                    'mtime': stat.st_mtime,
+                    'type': os.path.splitext(entry.name)[1].lstrip('.').lower(),
+                })
+        return files
+
+    def _listing(self, directory: str, now: float) -> Tuple[int, List[Dict[str, Any]]]:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._listings.pop(directory, None)
+            return 0, _NO_FILES
+        cached = self._listings.get(directory)
+        if cached and cached[0] == mtime and now - cached[1] < self.max_age_seconds:
+            return mtime, cached[2]
+        files = self._scan(directory)
+        self._listings[directory] = (mtime, now, files)
+        return mtime, files
+
+    def files(self, sort: str = "name", descending: bool = False) -> List[Dict[str, Any]]:
+        """
+        Every matching file across the directories in the given order. Each order is sorted once
+        per change to the listings and shared between callers, so do not modify the result.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        with self._lock:
+            now = time.monotonic()
+            listings = [self._listing(directory, now) for directory in self.directories]
+            # Each re-read returns a new list, so this changes exactly when some directory was re-read,
+            # appeared or disappeared.
+            version = tuple((mtime, id(files)) for mtime, files in listings)
+            if version != self._version:
+                self._version = version
+                self._sorted = {}
+            ordered = self._sorted.get((sort, descending))
+            if ordered is None:
+                merged = [f for _, files in listings for f in files]
+                ordered = self._sorted[(sort, descending)] = sorted(merged, key=SORT_KEYS[sort], reverse=descending)
+            return ordered
+
+    def query(self, types: Optional[Sequence[str]] = None, since: Optional[date] = None, until: Optional[date] = None,
+              search: Optional[str] = None, sort: str = "name", descending: bool = False,
+              page: int = 1, per_page: int = 50) -> Dict[str, Any]:
+        """
+        One page of files filtered by extension, modification date range (inclusive) and a
+        case-insensitive name substring. Raises ValueError for an unknown sort key.
+        """
+        files = self.files(sort, descending)
+        if types:
+            wanted = {t.lower().lstrip('.') for t in types}
+            files = [f for f in files if f['type'] in wanted]
+        if since or until:
+            start = datetime.combine(since, datetime.min.time()).timestamp() if since else float('-inf')
+            end = datetime.combine(until, datetime.max.time()).timestamp() if until else float('inf')
+            files = [f for f in files if start <= f['mtime'] <= end]
+        if search:
+            needle = search.lower()
+            files = [f for f in files if needle in f['name'].lower()]
+        per_page = max(1, per_page)
+        pages = max(1, -(-len(files) // per_page))
+        page = min(max(1, page), pages)
+        start_at = (page - 1) * per_page
+        return {"files": files[start_at:start_at + per_page], "total": len(files), "page": page, "per_page": per_page, "pages": pages}
@@ -0,0 +1,62 @@
+# status_stream.py
+
+import collections
+import threading
+import time
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+import json_codec
+
+class StatusBroadcaster:
+    """
+    Fans scraper status out to Server-Sent Events clients. The runner publishes the status dict
+    and, per finished site, a site event; each client wakes on a change, waits `coalesce_seconds`
+    so a burst of sites goes out as one `sites` event, then sends the latest `status`. Idle streams
+    get a comment line every `heartbeat_seconds`, which keeps proxies from closing them and lets a
+    dropped client be noticed. A client that falls more than `backlog` sites behind skips the
+    oldest events and is told how many it missed.
+    """
+    def __init__(self, coalesce_seconds: float = 0.5, heartbeat_seconds: float = 15.0, backlog: int = 1000):
+        self.coalesce_seconds = max(0.0, coalesce_seconds)
+        self.heartbeat_seconds = max(1.0, heartbeat_seconds)
+        self._changed = threading.Condition()
+        self._version = 0
+        self._site_seq = 0
+        self._status: Dict[str, Any] = {}
+        self._sites: Deque[Tuple[int, Dict[str, Any]]] = collections.deque(maxlen=max(1, backlog))
+
+    def publish(self, status: Dict[str, Any], site: Optional[Dict[str, Any]] = None) -> None:
+        """Records the current status, plus the site that just finished when there is one. Safe from any thread."""
+        with self._changed:
+            self._version += 1
+            self._status = dict(status)
+            if site is not None:
+                self._site_seq += 1
+                self._sites.append((self._site_seq, dict(site)))
+            self._changed.notify_all()
+
+    @staticmethod
+    def _event(name: str, data: Any) -> str:
+        return f"event: {name}\ndata: {json_codec.dumps(data)}\n\n"
+
+    def stream(self) -> Iterator[str]:
+        """SSE frames for one client: the current status first, then coalesced updates and heartbeats until it disconnects."""
+        with self._changed:
+            version, site_seq, status = self._version, self._site_seq, dict(self._status)
+        yield "retry: 3000\n\n"
+        yield self._event("status", status)
+        while True:
+            with self._changed:
+                changed = self._changed.wait_for(lambda: self._version != version, timeout=self.heartbeat_seconds)
+            if not changed:
+                yield ": heartbeat\n\n"
+                continue
+            time.sleep(self.coalesce_seconds)
+            with self._changed:
+                sites = [site for seq, site in self._sites if seq > site_seq]
+                oldest = self._sites[0][0] if self._sites else self._site_seq + 1
+                missed = max(0, oldest - site_seq - 1)
+                version, site_seq, status = self._version, self._site_seq, dict(self._status)
+            if sites or missed:
+                yield self._event("sites", {"sites": sites, "missed": missed})
+            yield self._event("status", status)
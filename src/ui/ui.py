@@ -7,23 +7,32 @@ class UIHandler:
     def __init__(self):
         self.total_urls = 0
         self.processed_count = 0
+        self.unchanged_count = 0
 
     def set_total_urls(self, total):
         self.total_urls = total
         print(f"Starting scrape of {total} URLs...")
 
-    def update_site_progress(self, url: str, success: bool, bonus_count: int, request_tracker):
+    def update_site_progress(self, url: str, success: bool, bonus_count: int, limiter, unchanged: bool = False, previous_count=None):
         self.processed_count += 1
-        status = "SUCCESS" if success and bonus_count > 0 else "FAIL"
+        if unchanged:
+            self.unchanged_count += 1
+            status = "UNCHANGED"
+        else:
+            status = "SUCCESS" if success and bonus_count > 0 else "FAIL"
         progress = f"[{self.processed_count}/{self.total_urls}]"
+        rate = limiter.rate() if limiter else 0.0
+        # Change against the site's last run, when there is one.
+        delta = f"({bonus_count - previous_count:+d})" if previous_count is not None and not unchanged else ""
         
         # Print a simple, single line for each update
-        print(f"{progress} {status:<8} | Bonuses: {bonus_count:<4} | URL: {url}")
+        print(f"{progress} {status:<9} | Bonuses: {bonus_count:<4} {delta:<6} | Rate: {rate:5.2f} req/s | URL: {url}")
 
     def print_final_summary(self, total_bonuses_found: int, failed_urls: int):
         print("\n" + "="*40)
         print("Scraping Complete")
         print(f"Total Bonuses Found: {total_bonuses_found}")
         print(f"Successful Sites: {self.processed_count - failed_urls}")
+        print(f"Unchanged Sites: {self.unchanged_count}")
         print(f"Failed Sites: {failed_urls}")
         print("="*40)
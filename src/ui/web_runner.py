@@ -0,0 +1,141 @@
+# web_runner.py
+
+import asyncio
+import atexit
+import concurrent.futures
+import configparser
+import itertools
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+import config
+import http_session
+import logger_config
+from main import run_scrape
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+class ScrapeRunner:
+    """
+    Runs the web app's scrape jobs through main.run_scrape on one long-lived event loop in a
+    daemon thread. The loop and a shared aiohttp session start with the first job and are reused
+    by every later one, so a web-triggered run pays no loop or connection-pool startup and matches
+    the CLI pipeline. Jobs run one at a time in submission order, since they share the run cache,
+    checkpoints and output files. Every status change is passed to `on_update` as a copy of the job,
+    together with the site event (URL, success, bonus count, unchanged, request rate) that caused it.
+    Only the newest `keep_finished` finished jobs are kept in `jobs`.
+    """
+    def __init__(self, config_path: str = "In/config.ini",
+                 on_update: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], Any]] = None,
+                 keep_finished: int = 100):
+        self.config_path = config_path
+        self.on_update = on_update
+        self.keep_finished = max(0, keep_finished)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._logger: Optional[logging.Logger] = None
+        self._turn: Optional[asyncio.Lock] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="scrape-runner", daemon=True).start()
+                atexit.register(self.close)
+            return self._loop
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Closes the shared session and stops the loop. Runs at interpreter exit once the loop has started."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def shutdown() -> None:
+            if self._session is not None:
+                await self._session.close()
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout)
+        except concurrent.futures.TimeoutError:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+
+    def submit(self, urls: Optional[List[str]] = None, overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+               resume: Optional[str] = None) -> str:
+        """
+        Queues a job and returns its ID. `urls` replaces the configured URL list, `overrides` maps
+        config sections to values replaced for this job only, and `resume` continues a checkpointed run.
+        """
+        job_id = str(next(self._ids))
+        job = {
+            "id": job_id, "message": "Queued", "is_running": True, "progress": 0, "total": len(urls or []),
+            "bonuses": 0, "failed": 0, "unchanged": 0, "rate": 0.0, "last_url": None, "run_id": resume,
+            "start_time": None, "last_update": _now(),
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+            self._forget_finished()
+        self._publish(job)
+        asyncio.run_coroutine_threadsafe(self._run(job, urls, overrides or {}, resume), self._ensure_loop())
+        return job_id
+
+    def _forget_finished(self) -> None:
+        # Jobs are inserted in ID order, so the first finished ones found are the oldest.
+        finished = [job_id for job_id, job in self.jobs.items() if not job["is_running"]]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def _publish(self, job: Dict[str, Any], site: Optional[Dict[str, Any]] = None) -> None:
+        if self.on_update:
+            self.on_update(dict(job), site)
+
+    def _update(self, job: Dict[str, Any], site: Optional[Dict[str, Any]] = None, **fields: Any) -> None:
+        job.update(fields, last_update=_now())
+        self._publish(job, site)
+
+    def _job_config(self, overrides: Dict[str, Dict[str, Any]]) -> configparser.ConfigParser:
+        app_config = config.get_config(self.config_path)
+        for section, values in overrides.items():
+            if not app_config.has_section(section):
+                app_config.add_section(section)
+            for key, value in values.items():
+                app_config.set(section, key, str(value))
+        return app_config
+
+    async def _run(self, job: Dict[str, Any], urls: Optional[List[str]], overrides: Dict[str, Dict[str, Any]], resume: Optional[str]) -> None:
+        if self._turn is None:
+            self._turn = asyncio.Lock()
+        async with self._turn:
+            self._update(job, message="Running", start_time=_now())
+
+            def on_site(progress: Dict[str, Any]) -> None:
+                site = progress["site"]
+                self._update(job, site, progress=progress["processed"], total=progress["total"], bonuses=progress["total_bonuses"],
+                             failed=progress["failed"], unchanged=progress["unchanged"], rate=site["rate"],
+                             last_url=site["url"], run_id=progress["run_id"])
+            try:
+                app_config = self._job_config(overrides)
+                if self._logger is None:
+                    # setup_logger replaces the logger's file handler, so it runs once per runner rather than per job;
+                    # per-job [logging] overrides do not apply.
+                    self._logger = logger_config.setup_logger(config.get_config(self.config_path))
+                if self._session is None or self._session.closed:
+                    # Built from the config file alone: per-job [http] overrides do not resize the shared pool.
+                    self._session = http_session.create_session(config.get_config(self.config_path))
+                summary = await run_scrape(app_config, self._logger, resume=resume, urls=urls, session=self._session, on_site=on_site)
+            except (Exception, SystemExit) as e:
+                self._update(job, message=f"Error: {e}", is_running=False)
+                return
+            if summary is None:
+                self._update(job, message=f"Error: run {resume} has no readable checkpoint", is_running=False)
+                return
+            self._update(job, message="Completed", is_running=False, progress=summary["processed"], total=summary["total"],
+                         bonuses=summary["total_bonuses"], failed=summary["failed"], unchanged=summary["unchanged"], run_id=summary["run_id"])
@@ -0,0 +1,8 @@
+# conftest.py
+
+import os
+import sys
+
+# The scraper modules import each other by bare name.
+for _pkg in ("core", "log", "io", "proc", "acq", "ui"):
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', _pkg))
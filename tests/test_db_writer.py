@@ -0,0 +1,35 @@
+# test_db_writer.py
+
+import datetime
+import logging
+
+from sqlalchemy import select
+
+from db_writer import BonusDBWriter
+from models import SITE_SCRAPED, Bonus, BonusRecord, SiteOutcome, SiteRun
+
+URL = "https://site-a.example"
+DAY = datetime.date(2026, 10, 18)
+
+def _bonus(bonus_id: str) -> BonusRecord:
+    return BonusRecord(URL, "A", bonus_id, f"bonus {bonus_id}", 10.0, 1.0, 0.0, 0.0, 0.0, None, 0.0, 0.0, "", "", "", "", "", "")
+
+def _day_ids(writer: BonusDBWriter):
+    with writer.engine.connect() as conn:
+        return sorted(conn.execute(select(Bonus.id).where(Bonus.url == URL, Bonus.scrape_date == DAY)).scalars())
+
+def test_same_day_rerun_drops_withdrawn_bonuses(tmp_path):
+    writer = BonusDBWriter(f"sqlite:///{tmp_path / 'bonuses.db'}", logging.getLogger("test"), scrape_date=DAY)
+    try:
+        writer.write([_bonus("1"), _bonus("2"), _bonus("3")], [SiteOutcome(URL, SITE_SCRAPED, 3)])
+        assert _day_ids(writer) == ["1", "2", "3"]
+
+        writer.write([_bonus("1"), _bonus("3")], [SiteOutcome(URL, SITE_SCRAPED, 2)])
+        assert _day_ids(writer) == ["1", "3"]
+        with writer.engine.connect() as conn:
+            assert conn.execute(select(SiteRun.bonus_count).where(SiteRun.url == URL, SiteRun.scrape_date == DAY)).scalar() == 2
+
+        writer.write([], [SiteOutcome(URL, SITE_SCRAPED, 0)])
+        assert _day_ids(writer) == []
+    finally:
+        writer.close()